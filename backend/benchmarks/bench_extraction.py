@@ -0,0 +1,356 @@
+# --- Extraction Benchmark ---
+# Runs the browser-free half of extract_profiles / extract_data / save_excel on saved pages:
+# the fixture corpus in benchmarks/fixtures (each page.html has a page.json golden output) plus
+# synthetic card and table pages of 10k-100k nodes. Every case runs under each parser backend
+# and reports pages/s, nodes/s, peak memory and precision/recall against the golden output.
+# Usage: python benchmarks/bench_extraction.py [--parsers lxml,bs4] [--sizes 10000,50000,100000]
+#                                              [--repeat 3] [--only name] [--no-memory] [--json out.json]
+from contextlib import redirect_stdout
+import argparse
+import gc
+import glob
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from dom_text import build_index, PARSERS  # noqa: E402
+from export import export_profiles, export_data  # noqa: E402
+from extractor import parse_listing, parse_data  # noqa: E402
+from normalize import TITLE_RE, PUNCT_RE, SPACE_RE  # noqa: E402
+from synthetic import NAV, synthetic_people  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows: fall back to tracemalloc, which only sees Python allocations
+    resource = None
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+DATA_TYPES = ["emails", "images", "tables"]
+
+
+class Case:
+    def __init__(self, name, kind, html, url, golden):
+        self.name = name
+        self.kind = kind
+        self.html = html
+        self.url = url
+        self.golden = golden
+
+
+# --- Corpus ---
+def load_fixtures():
+    cases = []
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html"))):
+        golden_path = path[:-len(".html")] + ".json"
+        if not os.path.exists(golden_path):
+            print(f"[Bench] Skipping {os.path.basename(path)}: no golden output")
+            continue
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        with open(golden_path, encoding="utf-8") as f:
+            golden = json.load(f)
+        name = os.path.splitext(os.path.basename(path))[0]
+        cases.append(Case(name, golden["kind"], html, golden.get("url"), golden))
+    return cases
+
+
+def _page(body):
+    nav = "".join(f'<li class="nav-item"><a class="nav-link" href="/{n.lower()}">{n}</a></li>' for n in NAV)
+    return (
+        f'<!DOCTYPE html><html><head><title>People</title></head><body>'
+        f'<nav class="navbar"><ul class="navbar-nav">{nav}</ul></nav><main class="container">{body}</main>'
+        f'<footer><p>Copyright University of Example. All rights reserved.</p>'
+        f'<a href="/privacy">Privacy policy</a> <a href="/contact">Contact us</a></footer></body></html>'
+    )
+
+
+def _cards(people):
+    cards = "".join(
+        f'<div class="col-md-4"><div class="card"><div class="card-body">'
+        f'<h5 class="card-title">{p["name"]}</h5><p class="card-text">Designation: {p["designation"]}</p>'
+        f'<p class="card-text">Department: {p["organization"]}</p>'
+        f'<p class="card-text">Email: <span>{p["email"]}</span></p></div></div></div>'
+        for p in people
+    )
+    return _page(f'<div class="row">{cards}</div>')
+
+
+def _table(people):
+    rows = "".join(
+        f'<tr><td>{p["name"]}</td><td>{p["designation"]}</td><td>{p["organization"]}</td>'
+        f'<td><a href="mailto:{p["email"]}">{p["email"]}</a></td></tr>'
+        for p in people
+    )
+    return _page(
+        '<table class="table"><thead><tr><th>Name</th><th>Designation</th><th>Department</th><th>Email</th></tr></thead>'
+        f'<tbody>{rows}</tbody></table>'
+    )
+
+
+SYNTHETIC_LAYOUTS = {"cards": _cards, "table": _table}
+
+
+def synthetic_case(layout, target_nodes, seed=5):
+    # Sized from the node count of a small sample page, so each case lands near its target
+    render = SYNTHETIC_LAYOUTS[layout]
+    base = build_index(render([]), "lxml").node_count
+    per_person = (build_index(render(list(synthetic_people(10, seed))), "lxml").node_count - base) / 10
+    people = list(synthetic_people(max(1, int((target_nodes - base) / per_person)), seed))
+    golden = {"kind": "profiles", "profiles": [{"name": p["name"], "email": p["email"]} for p in people], "next_pages": []}
+    return Case(f"synthetic_{layout}_{target_nodes // 1000}k", "profiles", render(people), "https://example.edu/people", golden)
+
+
+# --- Scoring ---
+def name_key(text):
+    text = SPACE_RE.sub(" ", PUNCT_RE.sub(" ", TITLE_RE.sub(" ", str(text))))
+    return f" {text.strip().lower()} "
+
+
+def score_profiles(profiles, golden):
+    """
+    One-to-one greedy matching: a profile matches the first unmatched golden person whose
+    title-free name appears in its text. Profiles covering several people count as merged.
+    """
+    people = golden["profiles"]
+    keys = [name_key(p["name"]) for p in people]
+    by_key = {}
+    for i, key in enumerate(keys):
+        by_key.setdefault(key, []).append(i)
+    matched = [None] * len(people)
+    merged = 0
+    for profile in profiles:
+        text = " ".join(str(v) for v in profile.values())
+        normalized = name_key(text)
+        # Candidate names are the golden keys found in the text; checked by word n-grams so
+        # scoring stays linear on the 100k-node pages
+        words = normalized.split()
+        hits = []
+        for size in range(2, 6):
+            for start in range(len(words) - size + 1):
+                gram = f" {' '.join(words[start:start + size])} "
+                if gram in by_key:
+                    hits.append(gram)
+        hit_people = {i for key in hits for i in by_key[key]}
+        if len({keys[i] for i in hit_people}) > 1:
+            merged += 1
+        for key in hits:
+            free = [i for i in by_key[key] if matched[i] is None]
+            if free:
+                # Synthetic pages repeat names; prefer the namesake whose email is on this profile
+                pick = next((i for i in free if people[i].get("email") and people[i]["email"] in text), free[0])
+                matched[pick] = text
+                break
+    true_positives = sum(m is not None for m in matched)
+    with_email = [(p, m) for p, m in zip(people, matched) if p.get("email")]
+    scores = {
+        "precision": true_positives / len(profiles) if profiles else 0.0,
+        "recall": true_positives / len(people) if people else 1.0,
+        "merged": merged,
+    }
+    if with_email:
+        scores["email_recall"] = sum(1 for p, m in with_email if m and p["email"] in m) / len(with_email)
+    return scores
+
+
+def _precision_recall(found, expected):
+    found, expected = set(found), set(expected)
+    hits = len(found & expected)
+    return (hits / len(found) if found else 1.0 if not expected else 0.0), (hits / len(expected) if expected else 1.0)
+
+
+def score_data(result, golden):
+    expected = golden["data"]
+    scores = {}
+    for section in ("emails", "images"):
+        scores[f"{section}_p"], scores[f"{section}_r"] = _precision_recall(result.get(section, []), expected.get(section, []))
+    found_rows = [tuple(row) for table in result.get("tables", []) for row in table]
+    expected_rows = [tuple(row) for table in expected.get("tables", []) for row in table]
+    scores["tables_p"], scores["tables_r"] = _precision_recall(found_rows, expected_rows)
+    scores["precision"] = statistics.mean(scores[f"{s}_p"] for s in ("emails", "images", "tables"))
+    scores["recall"] = statistics.mean(scores[f"{s}_r"] for s in ("emails", "images", "tables"))
+    return scores
+
+
+# --- Measurement ---
+def run_case(case, parser):
+    # The parse/classify work behind extract_profiles (one parse shared with pagination) or extract_data
+    with redirect_stdout(io.StringIO()):
+        if case.kind == "profiles":
+            return parse_listing(case.html, case.url, parser)
+        return parse_data(case.html, DATA_TYPES, parser)
+
+
+def run_export(case, output, workdir):
+    # The save_excel path: profiles are normalized onto the standard columns, data goes sheet by sheet
+    path = os.path.join(workdir, f"{case.name}.xlsx")
+    with redirect_stdout(io.StringIO()):
+        if case.kind == "profiles":
+            return export_profiles(output[0], path, "xlsx")
+        return export_data(output, path, "xlsx")
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+
+def _peak_rss_mb():
+    # Linux: VmHWM, which reset_peak_rss() can lower; elsewhere ru_maxrss (KiB on Linux, bytes on macOS)
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def reset_peak_rss():
+    # Writing 5 to clear_refs resets VmHWM to the current RSS (Linux 4.0+)
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def probe_memory(case, parser):
+    # Runs inside a fresh interpreter (see peak_memory_mb) so earlier cases leave no reusable heap behind
+    if resource is not None:
+        gc.collect()
+        reset_peak_rss()
+        before = _peak_rss_mb()
+        run_case(case, parser)
+        return _peak_rss_mb() - before
+    import tracemalloc
+    tracemalloc.start()
+    run_case(case, parser)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+
+def peak_memory_mb(case, parser, sizes):
+    """
+    Peak memory growth of one parse + extraction, measured in a child interpreter as max RSS
+    growth (lxml allocates outside the Python heap, so tracemalloc alone would miss most of it).
+    Without the resource module (Windows) the child reports the tracemalloc peak instead.
+    """
+    command = [sys.executable, os.path.abspath(__file__), "--probe", case.name, "--parsers", parser, "--sizes", sizes]
+    output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def bench_case(case, parser, repeat, memory, workdir, sizes):
+    nodes = build_index(case.html, parser).node_count
+    run_export(case, run_case(case, parser), workdir)  # warm-up: keyword automata, openpyxl import
+    parse_time, _ = timed(lambda: build_index(case.html, parser), repeat)
+    total_time, output = timed(lambda: run_case(case, parser), repeat)
+    export_time, export_rows = timed(lambda: run_export(case, output, workdir), repeat)
+    row = {
+        "case": case.name, "kind": case.kind, "parser": parser, "bytes": len(case.html), "nodes": nodes,
+        "parse_ms": parse_time * 1000, "extract_ms": total_time * 1000, "export_ms": export_time * 1000,
+        "export_rows": export_rows, "pages_per_s": 1 / total_time, "nodes_per_s": nodes / total_time,
+        "peak_mb": peak_memory_mb(case, parser, sizes) if memory else None,
+    }
+    if case.kind == "profiles":
+        profiles, next_pages = output
+        row["found"] = len(profiles)
+        row.update(score_profiles(profiles, case.golden))
+        row["next_pages_ok"] = next_pages == case.golden.get("next_pages", [])
+        row["fingerprint"] = json.dumps(profiles, sort_keys=True)
+    else:
+        row["found"] = sum(len(v) for v in output.values())
+        row.update(score_data(output, case.golden))
+        row["fingerprint"] = json.dumps({k: sorted(map(json.dumps, v)) for k, v in output.items()}, sort_keys=True)
+    return row
+
+
+# --- Report ---
+def print_report(rows, parsers):
+    header = f"{'case':<24}{'parser':<7}{'nodes':>8}{'parse ms':>10}{'extract ms':>11}{'xlsx ms':>9}{'pages/s':>9}{'nodes/s':>11}{'peak MB':>9}{'found':>7}{'P':>6}{'R':>6}  notes"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        notes = []
+        if "email_recall" in row:
+            notes.append(f"email R {row['email_recall']:.2f}")
+        if row.get("merged"):
+            notes.append(f"{row['merged']} merged")
+        if row.get("next_pages_ok") is False:
+            notes.append("next pages differ")
+        peak = f"{row['peak_mb']:.1f}" if row["peak_mb"] is not None else "-"
+        print(
+            f"{row['case']:<24}{row['parser']:<7}{row['nodes']:>8}{row['parse_ms']:>10.1f}{row['extract_ms']:>11.1f}"
+            f"{row['export_ms']:>9.1f}{row['pages_per_s']:>9.1f}{row['nodes_per_s']:>11.0f}{peak:>9}{row['found']:>7}"
+            f"{row['precision']:>6.2f}{row['recall']:>6.2f}  {', '.join(notes)}"
+        )
+    if len(parsers) < 2:
+        return
+    # Side by side: how much faster the first parser is than each other one, and whether outputs agree
+    base, others = parsers[0], parsers[1:]
+    print()
+    by_case = {}
+    for row in rows:
+        by_case.setdefault(row["case"], {})[row["parser"]] = row
+    for case, runs in by_case.items():
+        if base not in runs:
+            continue
+        parts = []
+        for other in others:
+            if other in runs:
+                speedup = runs[other]["extract_ms"] / runs[base]["extract_ms"]
+                same = "same output" if runs[other]["fingerprint"] == runs[base]["fingerprint"] else "outputs differ"
+                parts.append(f"{speedup:.1f}x vs {other} ({same})")
+        print(f"{case:<24}{base}: {'; '.join(parts)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline extraction benchmark (no browser needed)")
+    parser.add_argument("--parsers", default=",".join(PARSERS), help="comma-separated parser backends")
+    parser.add_argument("--sizes", default="10000,50000,100000", help="synthetic page sizes in nodes; empty for none")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case (median is reported)")
+    parser.add_argument("--only", help="run only cases whose name contains this text")
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak memory measurement")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--probe", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    parsers = [p for p in args.parsers.split(",") if p]
+    unknown = [p for p in parsers if p not in PARSERS]
+    if unknown:
+        parser.error(f"unknown parser(s) {', '.join(unknown)}; use {', '.join(PARSERS)}")
+    cases = load_fixtures()
+    for size in (int(s) for s in args.sizes.split(",") if s):
+        cases.extend(synthetic_case(layout, size) for layout in SYNTHETIC_LAYOUTS)
+    if args.probe:
+        case = next(case for case in cases if case.name == args.probe)
+        print(probe_memory(case, parsers[0]))
+        return
+    if args.only:
+        cases = [case for case in cases if args.only in case.name]
+    rows = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for case in cases:
+            for name in parsers:
+                rows.append(bench_case(case, name, args.repeat, not args.no_memory, workdir, args.sizes))
+    print_report(rows, parsers)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump([{k: v for k, v in row.items() if k != "fingerprint"} for row in rows], f, indent=2)
+        print(f"\n[Bench] Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
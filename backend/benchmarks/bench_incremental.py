@@ -0,0 +1,106 @@
+# --- Incremental Extraction Benchmark ---
+# Checks that section-by-section extraction (incremental mode) finds exactly the profiles the
+# whole-page pass finds, on directory pages whose header and footer hold profile-like blocks,
+# then times a cold run, an unchanged re-run and a re-run after one card was edited.
+# Usage: python benchmarks/bench_incremental.py [cards]
+from contextlib import redirect_stdout
+import gc
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Keep the benchmark's section store away from the service's
+os.environ["PROFILE_STORE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="bench_incremental_"), "profiles.sqlite3")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from extractor import parse_profiles, parse_sections  # noqa: E402
+from synthetic import NAV, synthetic_people  # noqa: E402
+
+URL = "https://example.edu/people"
+
+
+def _page(body):
+    # Header and footer blocks carry profile keywords, so the card pass reads them like any other block
+    nav = "".join(f'<li><a href="/{n.lower()}">{n}</a></li>' for n in NAV)
+    return (
+        f'<!DOCTYPE html><html><head><title>People</title></head><body>'
+        f'<header><div class="notice">Message from the Chairperson: Professor Ahmed Khan, Department of Physics, '
+        f'welcomes new faculty members</div><ul class="menu">{nav}</ul></header>'
+        f'<main class="container">{body}</main>'
+        f'<footer><div class="office">Office of the Dean, Faculty of Arts. Lecturer and professor appointments: '
+        f'Email: dean@example.edu</div><div>Copyright University of Example</div></footer></body></html>'
+    )
+
+
+def _cards(people):
+    return _page('<div class="row">' + "".join(
+        f'<div class="col-md-4"><div class="card"><h5>{p["name"]}</h5><p>Designation: {p["designation"]}</p>'
+        f'<p>Department: {p["organization"]}</p><p>Email: {p["email"]}</p></div></div>'
+        for p in people
+    ) + '</div>')
+
+
+def _table(people):
+    return _page(
+        '<table><thead><tr><th>Name</th><th>Designation</th><th>Department</th></tr></thead><tbody>' + "".join(
+            f'<tr><td>{p["name"]}</td><td>{p["designation"]}</td><td>{p["organization"]}</td></tr>' for p in people
+        ) + '</tbody></table>'
+    )
+
+
+def _links(people):
+    return _page('<ul class="people">' + "".join(
+        f'<li><a href="/people/{i}">{p["name"]}</a> Designation: {p["designation"]}; Department: {p["organization"]}</li>'
+        for i, p in enumerate(people)
+    ) + '</ul>')
+
+
+LAYOUTS = {"cards": _cards, "table": _table, "links": _links}
+
+
+def timed(fn, pages, **kwargs):
+    # Median time of one call per page; the extractor's progress output is silenced
+    times, results = [], []
+    for page in pages:
+        gc.collect()
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            results.append(fn(page, URL, **kwargs))
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), results
+
+
+def main():
+    cards = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    repeat = 5
+    for layout, render in LAYOUTS.items():
+        people = list(synthetic_people(cards, seed=13))
+        html = render(people)
+        # Each edited page changes a different card, so no edited run finds its sections stored
+        edited = []
+        for i in range(repeat):
+            changed, at = list(people), (i + 1) * cards // (repeat + 1)
+            changed[at] = dict(changed[at], designation="Professor Emeritus")
+            edited.append(render(changed))
+        whole_time, (expected, *_) = timed(parse_profiles, [html] * repeat)
+        runs = {
+            "cold": timed(parse_sections, [html] * repeat, reuse=False),
+            "unchanged": timed(parse_sections, [html] * repeat),
+            "edited": timed(parse_sections, edited),
+        }
+        for name, (_, results) in runs.items():
+            pages = edited if name == "edited" else [html] * repeat
+            for page, found in zip(pages, results):
+                with redirect_stdout(io.StringIO()):
+                    whole = expected if page is html else parse_profiles(page, URL)
+                assert found == whole, f"{layout} ({name}): sectioned extraction found {len(found)} profiles, whole page {len(whole)}"
+        print(
+            f"{layout:6} cards: {cards}  profiles: {len(expected)}  whole page: {whole_time:.3f} s  "
+            + "  ".join(f"{name}: {seconds:.3f} s" for name, (seconds, _) in runs.items())
+        )
+
+
+if __name__ == "__main__":
+    main()
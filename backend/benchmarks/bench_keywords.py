@@ -0,0 +1,79 @@
+# --- Keyword Matcher Benchmark ---
+# Compares the old per-keyword regex scan from extract_profiles with the single-pass
+# KeywordMatcher on block texts shaped like a large directory page.
+# Usage: python benchmarks/bench_keywords.py [cards]
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from keywords import KeywordMatcher, PROFILE_KEYWORDS, NAVIGATION_KEYWORDS  # noqa: E402
+from synthetic import NAV, synthetic_people  # noqa: E402
+
+# Navigation strip of a directory page, with the utility links headers and footers add
+NAV_TEXT = " ".join(NAV + ["Login", "Search", "Privacy", "Terms"])
+
+
+def card_text(person, rng):
+    return (
+        f"{person['name']} Designation: {person['designation']} ; Department: {person['organization']} ; "
+        f"Email: {person['email']} ; Phone: +880 1{rng.randint(100000000, 999999999)} ; "
+        f"Research interest: machine learning and public health, qualification PhD (Dhaka)"
+    )
+
+
+def page_block_texts(cards, seed=7):
+    # Every card contributes its own text plus the text its wrapping li/div ancestors re-read
+    rng = random.Random(seed)
+    texts = [NAV_TEXT] * 20
+    row = []
+    for person in synthetic_people(cards, seed):
+        text = card_text(person, rng)
+        texts.extend([text, text])
+        row.append(text)
+        if len(row) == 4:
+            texts.append(" ".join(row))
+            row = []
+    return texts
+
+
+def legacy_flags(texts):
+    flags = []
+    for text in texts:
+        has_profile = any(re.search(r'\b' + re.escape(kw) + r'\b', text.lower()) for kw in PROFILE_KEYWORDS)
+        is_nav = any(re.search(r'\b' + re.escape(kw) + r'\b', text.lower()) for kw in NAVIGATION_KEYWORDS)
+        flags.append((has_profile, is_nav))
+    return flags
+
+
+def matcher_flags(matcher, texts):
+    flags = []
+    for text in texts:
+        profile_hits, nav_hits = matcher.classify(text)
+        flags.append((bool(profile_hits), bool(nav_hits)))
+    return flags
+
+
+def main():
+    cards = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    texts = page_block_texts(cards)
+    start = time.perf_counter()
+    matcher = KeywordMatcher()
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    before = legacy_flags(texts)
+    legacy_time = time.perf_counter() - start
+    start = time.perf_counter()
+    after = matcher_flags(matcher, texts)
+    matcher_time = time.perf_counter() - start
+    assert before == after, "KeywordMatcher disagrees with the legacy per-keyword scan"
+    chars = sum(len(t) for t in texts)
+    print(f"texts: {len(texts)}  chars: {chars}  matcher build: {build * 1000:.1f} ms")
+    print(f"legacy per-keyword re.search: {legacy_time:.3f} s")
+    print(f"KeywordMatcher.classify:      {matcher_time:.3f} s  ({legacy_time / matcher_time:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
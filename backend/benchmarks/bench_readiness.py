@@ -0,0 +1,93 @@
+# --- Readiness Benchmark ---
+# Runs wait_for_ready and scroll_to_end against a fake driver that simulates a page's probe state
+# (in-flight requests, last DOM mutation, page height) without a browser, and checks how long each
+# wait takes: a quiet page settles after `quiet_ms`, a page whose DOM never stops changing settles
+# after QUIET_ROUNDS windows of network idle, and a lazy-loading page is scrolled to its end.
+# Usage: python benchmarks/bench_readiness.py [quiet_ms]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import readiness  # noqa: E402
+from readiness import QUIET_ROUNDS, scroll_to_end, wait_for_ready  # noqa: E402
+
+
+class FakeDriver:
+    """
+    Answers the readiness probe from a simulated page: each scroll to the bottom starts a fetch
+    that takes `fetch_ms` and then adds one screen of content, until `pages` screens are loaded.
+    With `mutating` set the DOM changes on every poll, like a ticker or a clock.
+    """
+
+    def __init__(self, pages=1, fetch_ms=0, mutating=False):
+        self.pages = pages
+        self.fetch_ms = fetch_ms
+        self.mutating = mutating
+        self.loaded = 1
+        self.resources = 10
+        self.fetch_done = None
+        self.last_mutation = time.monotonic() - 10
+
+    def _tick(self):
+        now = time.monotonic()
+        if self.fetch_done is not None and now >= self.fetch_done:
+            self.fetch_done = None
+            self.loaded += 1
+            self.resources += 1
+            self.last_mutation = now
+        if self.mutating:
+            self.last_mutation = now
+        return now
+
+    def execute_script(self, script):
+        now = self._tick()
+        if script.startswith("window.scrollTo"):
+            if self.fetch_done is None and self.loaded < self.pages:
+                self.fetch_done = now + self.fetch_ms / 1000
+            return None
+        return {
+            "ready": "complete",
+            "inflight": 1 if self.fetch_done is not None else 0,
+            "quietMs": (now - self.last_mutation) * 1000,
+            "resources": self.resources,
+            "height": self.loaded * 1000,
+        }
+
+
+SCENARIOS = {
+    "static": dict(),
+    "mutating": dict(mutating=True),
+    "lazy": dict(pages=6, fetch_ms=150),
+    "lazy+mutating": dict(pages=6, fetch_ms=150, mutating=True),
+}
+
+
+def main():
+    quiet_ms = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    # Generous timeouts, as in production: no scenario should get near them
+    ready_timeout, scroll_timeout = 15, 30
+    slack = 0.3 + 2 * readiness.POLL_INTERVAL
+    for name, page in SCENARIOS.items():
+        driver = FakeDriver(**page)
+        start = time.monotonic()
+        ready = wait_for_ready(driver, timeout=ready_timeout, quiet_ms=quiet_ms)
+        ready_time = time.monotonic() - start
+        start = time.monotonic()
+        grown = scroll_to_end(driver, timeout=scroll_timeout, quiet_ms=quiet_ms)
+        scroll_time = time.monotonic() - start
+
+        # Settling never waits longer than QUIET_ROUNDS windows; each scroll round takes at most one
+        # fetch plus QUIET_ROUNDS windows, and the last round (nothing to load) ends the scroll
+        ready_bound = quiet_ms * QUIET_ROUNDS / 1000 + slack
+        round_bound = (page.get("fetch_ms", 0) + quiet_ms * QUIET_ROUNDS) / 1000
+        scroll_bound = (grown + 1) * round_bound + slack
+        assert ready, f"{name}: page never settled"
+        assert ready_time <= ready_bound, f"{name}: settling took {ready_time:.2f} s (bound {ready_bound:.2f} s)"
+        assert grown == page.get("pages", 1) - 1, f"{name}: scrolled {grown} rounds, page has {page.get('pages', 1)} screens"
+        assert scroll_time <= scroll_bound, f"{name}: scrolling took {scroll_time:.2f} s (bound {scroll_bound:.2f} s)"
+        print(f"{name:14} ready: {ready_time:.2f} s  scroll: {scroll_time:.2f} s  rounds grown: {grown}")
+
+
+if __name__ == "__main__":
+    main()
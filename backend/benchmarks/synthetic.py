@@ -0,0 +1,20 @@
+# --- Synthetic Directory Data ---
+# Names, roles and organizations shared by the benchmarks, and the seeded person generator
+# they build card, table and crawl-output inputs from.
+import random
+
+FIRST = ["Ashraf", "Sumit", "Farhana", "Rubina", "Kabir", "Sharmin", "Mannan", "Sultana", "Aziz", "Moonmoon", "Nadia", "Tanvir"]
+MIDDLE = ["Nur", "Jahan", "Uddin", "Rahman", "Hasan", "Akter", "Kumar", "Begum", "Alam", "Haque"]
+LAST = ["Islam", "Chowdhury", "Hussain", "Saha", "Rana", "Sikder", "Karmaker", "Banoo", "Ahmed", "Khan"]
+TITLES = ["Dr.", "Prof.", "Mr.", "Mrs.", "Md.", ""]
+ROLES = ["Professor", "Associate Professor", "Assistant Professor", "Lecturer", "Consultant"]
+ORGS = ["Department of Physics", "Institute of Health", "Division of Surgery", "Faculty of Arts", "School of Law"]
+NAV = ["Home", "About", "Admission", "Academics", "Research", "Libraries", "News", "Events", "Notice", "Contact"]
+
+
+def synthetic_people(count, seed):
+    # Same seed, same people: golden outputs are built from the list the page was rendered from
+    rng = random.Random(seed)
+    for i in range(count):
+        name = f"{rng.choice(['Dr. ', 'Prof. ', ''])}{rng.choice(FIRST)} {rng.choice(MIDDLE)} {rng.choice(LAST)}"
+        yield {"name": name, "designation": rng.choice(ROLES), "organization": rng.choice(ORGS), "email": f"person{i}@example.edu"}
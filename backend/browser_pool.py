@@ -0,0 +1,191 @@
+# --- Imports ---
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from webdriver_manager.chrome import ChromeDriverManager
+from contextlib import contextmanager
+import os
+import queue
+import threading
+from urllib.parse import urlsplit
+
+# --- Pool Settings (override through environment) ---
+POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+MAX_USES = int(os.getenv("BROWSER_MAX_USES", "50"))
+ACQUIRE_TIMEOUT = float(os.getenv("BROWSER_ACQUIRE_TIMEOUT", "120"))
+# "eager" returns from driver.get at DOMContentLoaded; readiness.wait_for_ready covers the rest
+PAGE_LOAD_STRATEGY = os.getenv("BROWSER_PAGE_LOAD_STRATEGY", "eager")
+WINDOW_SIZE = os.getenv("RENDER_VIEWPORT", "1280x900").lower().replace("x", ",")
+
+
+def chrome_options():
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument(f"--window-size={WINDOW_SIZE}")
+    chrome_options.add_argument("--mute-audio")
+    chrome_options.add_argument("--autoplay-policy=user-gesture-required")
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--disable-background-networking")
+    chrome_options.page_load_strategy = PAGE_LOAD_STRATEGY
+    return chrome_options
+
+
+class BrowserPool:
+    """
+    Keeps a fixed number of warm headless Chrome drivers.
+    Drivers are handed out with `acquire()`, reset to a blank tab between uses,
+    recycled after `max_uses` navigations or when they crash, and always returned.
+    """
+
+    def __init__(self, size=POOL_SIZE, max_uses=MAX_USES):
+        self.size = max(1, size)
+        self.max_uses = max(1, max_uses)
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._driver_path = None
+        self._uses = {}
+        self._live = set()
+        self._closed = False
+
+    # The driver-manager lookup hits the network, so it runs once per process
+    def _resolve_driver_path(self):
+        with self._lock:
+            if self._driver_path is None:
+                self._driver_path = ChromeDriverManager().install()
+            return self._driver_path
+
+    def _launch(self):
+        driver = webdriver.Chrome(service=Service(self._resolve_driver_path()), options=chrome_options())
+        with self._lock:
+            self._uses[id(driver)] = 0
+            self._live.add(driver)
+        return driver
+
+    def _discard(self, driver):
+        with self._lock:
+            self._uses.pop(id(driver), None)
+            self._live.discard(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _tab_origins(driver):
+        # Every origin the current tab navigated to, plus the frames it shows now
+        urls = [entry["url"] for entry in driver.execute_cdp_cmd("Page.getNavigationHistory", {})["entries"]]
+        frames = [driver.execute_cdp_cmd("Page.getFrameTree", {})["frameTree"]]
+        while frames:
+            frame = frames.pop()
+            urls.append(frame["frame"]["url"])
+            frames.extend(frame.get("childFrames", []))
+        origins = set()
+        for url in urls:
+            parts = urlsplit(url)
+            if parts.scheme in ("http", "https") and parts.netloc:
+                origins.add(f"{parts.scheme}://{parts.netloc}")
+        return origins
+
+    def _reset(self, driver):
+        # Move to a fresh tab (new sessionStorage) and close every other one, then wipe browser-wide state:
+        # delete_all_cookies() would only cover the current document's domain, and storage can only be
+        # cleared per origin, so the origins are read from each tab's history before it closes
+        old = driver.window_handles
+        origins = set()
+        driver.switch_to.new_window("tab")
+        for handle in old:
+            driver.switch_to.window(handle)
+            try:
+                origins |= self._tab_origins(driver)
+            except WebDriverException:
+                pass
+            driver.close()
+        driver.switch_to.window(driver.window_handles[0])
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+        for origin in origins:
+            driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+        driver.get("about:blank")
+
+    def start(self):
+        # Pre-warm every slot so the first requests do not pay Chrome startup
+        warm = []
+        for _ in range(self.size):
+            self._slots.acquire()
+            try:
+                warm.append(self._launch())
+            except Exception:
+                self._slots.release()
+                raise
+        for driver in warm:
+            self._idle.put(driver)
+            self._slots.release()
+        print(f"[Browser Pool] Started {len(warm)} Chrome instance(s), recycle after {self.max_uses} uses.")
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
+        with self._lock:
+            leftovers = list(self._live)
+        for driver in leftovers:
+            self._discard(driver)
+
+    def stats(self):
+        with self._lock:
+            live = len(self._live)
+        return {"size": self.size, "live": live, "idle": self._idle.qsize(), "max_uses": self.max_uses}
+
+    @contextmanager
+    def acquire(self, timeout=ACQUIRE_TIMEOUT):
+        if self._closed:
+            raise RuntimeError("Browser pool is closed")
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"No browser available after {timeout}s")
+        driver = None
+        healthy = False
+        try:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                driver = self._launch()
+            with self._lock:
+                self._uses[id(driver)] = self._uses.get(id(driver), 0) + 1
+            try:
+                yield driver
+                healthy = True
+            except WebDriverException:
+                # Crashed or wedged browser: never hand it out again
+                raise
+            except Exception:
+                healthy = True
+                raise
+        finally:
+            if driver is not None:
+                self._release(driver, healthy)
+            self._slots.release()
+
+    def _release(self, driver, healthy):
+        with self._lock:
+            uses = self._uses.get(id(driver), 0)
+        if self._closed or not healthy or uses >= self.max_uses:
+            self._discard(driver)
+            return
+        try:
+            self._reset(driver)
+        except Exception:
+            self._discard(driver)
+            return
+        self._idle.put(driver)
+
+
+browser_pool = BrowserPool()
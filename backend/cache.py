@@ -0,0 +1,264 @@
+# --- Imports ---
+from crawl import normalize_url
+from fetcher import FetchResult, static_result
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+
+# --- Cache Settings (override through environment) ---
+CACHE_DIR = os.getenv("PAGE_CACHE_DIR", os.path.join(os.path.dirname(__file__), "cache"))
+CACHE_TTL = float(os.getenv("PAGE_CACHE_TTL", "3600"))
+CACHE_MAX_AGE = float(os.getenv("PAGE_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+CACHE_MAX_BYTES = int(float(os.getenv("PAGE_CACHE_MAX_MB", "512")) * 1024 * 1024)
+CACHE_MAX_RESULTS = int(os.getenv("PAGE_CACHE_MAX_RESULTS", "5000"))
+
+
+def options_key(options):
+    return json.dumps(options or {}, sort_keys=True, default=str)
+
+
+def content_hash(html):
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+
+class PageCache:
+    """
+    On-disk cache of fetched/rendered HTML keyed by normalized URL plus render options.
+    Pages are zlib-compressed files; metadata (validators, content hash, sizes, access times)
+    lives in SQLite. Parsed extraction results are memoized separately by content hash,
+    so an unchanged page skips both rendering and parsing.
+    """
+
+    def __init__(self, directory=CACHE_DIR, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES, max_age=CACHE_MAX_AGE):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.counters = {
+            "hits": 0, "misses": 0, "revalidated": 0, "refreshed": 0, "evictions": 0,
+            "result_hits": 0, "result_misses": 0,
+        }
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _conn(self):
+        if self._db is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(self.directory, "index.sqlite3"), check_same_thread=False)
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    key TEXT PRIMARY KEY, url TEXT, options TEXT, path TEXT, tier TEXT,
+                    etag TEXT, last_modified TEXT, content_hash TEXT, size INTEGER,
+                    fetched_at REAL, accessed_at REAL
+                );
+                CREATE TABLE IF NOT EXISTS results (
+                    content_hash TEXT, kind TEXT, options TEXT, data BLOB, size INTEGER, accessed_at REAL,
+                    PRIMARY KEY (content_hash, kind, options)
+                );
+                CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed_at);
+                CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed_at);
+            """)
+        return self._db
+
+    def key(self, url, options=None):
+        return hashlib.sha256(f"{normalize_url(url) or url}\n{options_key(options)}".encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.html.z")
+
+    # --- Pages ---
+    def get(self, url, options=None):
+        key = self.key(url, options)
+        with self._lock:
+            row = self._conn().execute(
+                "SELECT url, path, tier, etag, last_modified, content_hash, fetched_at FROM pages WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn().execute("UPDATE pages SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn().commit()
+        try:
+            with open(row[1], "rb") as f:
+                html = zlib.decompress(f.read()).decode("utf-8")
+        except (OSError, zlib.error):
+            self.delete(key)
+            return None
+        return {
+            "key": key, "url": row[0], "html": html, "tier": row[2], "etag": row[3],
+            "last_modified": row[4], "content_hash": row[5], "fetched_at": row[6],
+            "fresh": time.time() - row[6] < self.ttl,
+        }
+
+    def put(self, url, options, page):
+        key = self.key(url, options)
+        data = zlib.compress(page.html.encode("utf-8"), 6)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # A temp file of its own per write: concurrent puts for the same key must not share one
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), prefix=os.path.basename(path), suffix=".tmp", delete=False) as f:
+            f.write(data)
+        try:
+            os.replace(f.name, path)
+        except OSError:
+            os.remove(f.name)
+            raise
+        headers = {k.lower(): v for k, v in (page.headers or {}).items()}
+        digest = content_hash(page.html)
+        now = time.time()
+        with self._lock:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, page.url, options_key(options), path, page.tier, headers.get("etag"),
+                 headers.get("last-modified"), digest, len(data), now, now),
+            )
+            self._conn().commit()
+        self.evict()
+        return digest
+
+    def touch(self, key):
+        # A 304 revalidation makes the stored copy fresh again
+        with self._lock:
+            now = time.time()
+            self._conn().execute("UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+            self._conn().commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._conn().execute("DELETE FROM pages WHERE key = ?", (key,))
+            self._conn().commit()
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def evict(self):
+        # Drop pages past max_age, then least-recently-used pages until the cache fits in max_bytes
+        with self._lock:
+            db = self._conn()
+            doomed = [row[0] for row in db.execute("SELECT key FROM pages WHERE fetched_at < ?", (time.time() - self.max_age,))]
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+            if total > self.max_bytes:
+                for key, size in db.execute("SELECT key, size FROM pages ORDER BY accessed_at"):
+                    if total <= self.max_bytes:
+                        break
+                    if key not in doomed:
+                        doomed.append(key)
+                        total -= size
+            for key in doomed:
+                db.execute("DELETE FROM pages WHERE key = ?", (key,))
+            db.execute(
+                "DELETE FROM results WHERE rowid NOT IN (SELECT rowid FROM results ORDER BY accessed_at DESC LIMIT ?)",
+                (CACHE_MAX_RESULTS,),
+            )
+            db.commit()
+            self.counters["evictions"] += len(doomed)
+        for key in doomed:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    # --- Parsed results memoized by content hash ---
+    def get_result(self, digest, kind, options=None):
+        if not digest:
+            return None
+        with self._lock:
+            row = self._conn().execute(
+                "SELECT data FROM results WHERE content_hash = ? AND kind = ? AND options = ?",
+                (digest, kind, options_key(options)),
+            ).fetchone()
+            if row is None:
+                self.counters["result_misses"] += 1
+                return None
+            self._conn().execute(
+                "UPDATE results SET accessed_at = ? WHERE content_hash = ? AND kind = ? AND options = ?",
+                (time.time(), digest, kind, options_key(options)),
+            )
+            self._conn().commit()
+            self.counters["result_hits"] += 1
+        return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+
+    def put_result(self, digest, kind, options, result):
+        if not digest:
+            return
+        data = zlib.compress(json.dumps(result, default=str).encode("utf-8"), 6)
+        with self._lock:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                (digest, kind, options_key(options), data, len(data), time.time()),
+            )
+            self._conn().commit()
+
+    def stats(self):
+        with self._lock:
+            pages, size = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+            results = self._conn().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            counters = dict(self.counters)
+        return {"pages": pages, "bytes": size, "results": results, "ttl": self.ttl, "max_bytes": self.max_bytes, **counters}
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+
+async def fetch_with_cache(fetcher, url, render, mode="auto", options=None, refresh=False, cache=None):
+    """
+    Fetches through the page cache. Fresh entries are served directly; stale entries with
+    an ETag/Last-Modified are revalidated with a conditional GET (304 keeps the stored copy);
+    everything else goes to the tiered fetcher and is stored. `refresh` skips the lookup.
+    The returned FetchResult carries `cache` ("hit", "revalidated", "miss", "refresh") and `content_hash`.
+    """
+    cache = cache or page_cache
+    loop = asyncio.get_event_loop()
+    options = dict(options or {}, fetch_mode=mode)
+    entry = None if refresh else await loop.run_in_executor(None, cache.get, url, options)
+    prefetched = None
+    if entry is not None:
+        if entry["fresh"]:
+            cache.count("hits")
+            return _from_entry(entry, "hit")
+        conditional = {}
+        if entry["etag"]:
+            conditional["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            conditional["If-Modified-Since"] = entry["last_modified"]
+        if conditional:
+            await fetcher.start()
+            try:
+                response = await fetcher.client.get(url, headers=conditional)
+            except Exception as e:
+                print(f"[Page Cache] Revalidation failed for {url}: {e}")
+                response = None
+            if response is not None and response.status_code == 304:
+                await loop.run_in_executor(None, cache.touch, entry["key"])
+                cache.count("revalidated")
+                return _from_entry(entry, "revalidated")
+            if response is not None and response.status_code == 200:
+                # The changed page stands in for the fetcher's static request, which decides on the browser fallback
+                prefetched = static_result(response)
+    cache.count("refreshed" if refresh else "misses")
+    page = await fetcher.fetch(url, render, mode=mode, static=prefetched)
+    return await _store(cache, url, options, page, "refresh" if refresh else "miss")
+
+
+def _from_entry(entry, status):
+    page = FetchResult(entry["url"], entry["html"], entry["tier"], 200, {})
+    page.cache = status
+    page.content_hash = entry["content_hash"]
+    return page
+
+
+async def _store(cache, url, options, page, status):
+    loop = asyncio.get_event_loop()
+    page.content_hash = await loop.run_in_executor(None, cache.put, url, options, page)
+    page.cache = status
+    return page
+
+
+page_cache = PageCache()
@@ -0,0 +1,257 @@
+# --- Imports ---
+from collections import Counter, defaultdict
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode
+import asyncio
+import os
+import re
+import time
+
+# --- Crawl Settings (override through environment or the request's "crawl" object) ---
+# Listing (pagination) pages and profile detail pages have separate budgets, so a
+# directory's detail pages cannot use up the pages needed to reach its last listing page
+MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "50"))
+MAX_DETAIL_PAGES = int(os.getenv("CRAWL_MAX_DETAIL_PAGES", "1000"))
+MAX_DEPTH = int(os.getenv("CRAWL_MAX_DEPTH", "1"))
+CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", "4"))
+PER_HOST_CONCURRENCY = int(os.getenv("CRAWL_PER_HOST_CONCURRENCY", "2"))
+POLITENESS_DELAY = float(os.getenv("CRAWL_POLITENESS_DELAY", "0.5"))
+
+TRACKING_PARAMS = {"fbclid", "gclid", "msclkid", "mc_cid", "mc_eid", "_ga", "ref", "sessionid", "phpsessid", "jsessionid"}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url, base=None):
+    """
+    Canonical form used for dedup: absolute, lowercase scheme/host, no default port,
+    no fragment, no tracking parameters, sorted query. Returns None for non-HTTP links.
+    """
+    if not url:
+        return None
+    url = url.strip()
+    if base:
+        url = urljoin(base, url)
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+    host = parts.hostname.lower()
+    if parts.port and parts.port != DEFAULT_PORTS[scheme]:
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    )
+    path = re.sub(r"/{2,}", "/", parts.path) or "/"
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+# --- Pagination Detection ---
+_NEXT_TEXTS = {"next", "next page", "next »", "next ›", "»", "›", ">", ">>", "more", "older", "older posts"}
+
+
+def find_next_pages(index, base_url):
+    # Links marked rel=next, or whose text/aria-label/class reads as "next page"
+    found = []
+    for node in index.find_all(['a', 'link']):
+        href = index.attr(node, 'href')
+        if not href:
+            continue
+        rel = index.attr(node, 'rel') or ''
+        rel = ' '.join(rel) if isinstance(rel, (list, tuple)) else rel
+        label = (index.attr(node, 'aria-label') or '').lower()
+        classes = index.attr(node, 'class') or ''
+        classes = ' '.join(classes) if isinstance(classes, (list, tuple)) else classes
+        text = index.text(node).strip().lower() if index.name(node) == 'a' else ''
+        if (
+            'next' in rel.lower().split() or text in _NEXT_TEXTS or
+            label.startswith('next') or re.search(r'\bnext\b', classes.lower())
+        ):
+            url = normalize_url(href, base_url)
+            if url and url not in found:
+                found.append(url)
+    return found
+
+
+# --- Detail Page Enrichment ---
+EMAIL_RE = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b")
+PHONE_RE = re.compile(r"(?:\+?\d[\d\s\-()]{7,}\d)")
+QUALIFICATION_RE = re.compile(
+    r"\b(?:MBBS|BDS|FCPS|FRCS|MRCP|FRCP|MD|MS|MPH|PhD|Ph\.D\.?|MPhil|M\.Phil\.?|MSc|M\.Sc\.?|BSc|B\.Sc\.?|MBA|MA|BA|DM|DCH|DGO)\b[^;\n|]{0,80}"
+)
+
+
+def detail_fields(text):
+    fields = {}
+    emails = list(dict.fromkeys(EMAIL_RE.findall(text)))
+    if emails:
+        fields['email'] = ', '.join(emails[:3])
+    phones = list(dict.fromkeys(p.strip() for p in PHONE_RE.findall(text) if len(re.sub(r'\D', '', p)) >= 8))
+    if phones:
+        fields['phone'] = ', '.join(phones[:3])
+    qualifications = list(dict.fromkeys(m.group(0).strip() for m in QUALIFICATION_RE.finditer(text)))
+    if qualifications:
+        fields['qualification'] = '; '.join(qualifications[:5])
+    return fields
+
+
+class HostLimiter:
+    # Caps concurrent requests per host and spaces consecutive requests by `delay` seconds
+    def __init__(self, per_host=PER_HOST_CONCURRENCY, delay=POLITENESS_DELAY):
+        self.delay = delay
+        self._slots = defaultdict(lambda: asyncio.Semaphore(per_host))
+        self._locks = defaultdict(asyncio.Lock)
+        self._last = {}
+
+    async def acquire(self, host):
+        await self._slots[host].acquire()
+        async with self._locks[host]:
+            wait = self._last.get(host, 0) + self.delay - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last[host] = time.monotonic()
+
+    def release(self, host):
+        self._slots[host].release()
+
+
+async def crawl_profiles(job, start_url, fetch_page, parse_listing, parse_detail, options=None, sink=None):
+    """
+    Crawls a directory: follows pagination from `start_url` to the end and, when
+    `max_depth` >= 1, fetches each profile's detail page to fill email/phone/qualification.
+      fetch_page(url) -> FetchResult                      (async)
+      parse_listing(html, url) -> (profiles, next_urls)   (blocking, runs in a worker thread)
+      parse_detail(html, url) -> page text                (blocking, runs in a worker thread)
+      sink(profiles)                                      (async, optional)
+    Without `sink` the profiles are collected and returned in listing order. With it they are
+    handed over as soon as they are final (a profile waiting for its detail page goes after it,
+    fetched or not) and not kept; the first error the sink raises ends the crawl.
+    Options: max_pages (listing pages), max_detail_pages, max_depth, concurrency, per_host,
+    delay, same_host (default true). stats["truncated"] is true when a limit left pages unfetched,
+    stats["profiles"] counts the profiles found.
+    """
+    options = options if isinstance(options, dict) else {}
+    limits = {
+        "listing": int(options.get("max_pages", MAX_PAGES)),
+        "detail": int(options.get("max_detail_pages", MAX_DETAIL_PAGES)),
+    }
+    max_depth = int(options.get("max_depth", MAX_DEPTH))
+    concurrency = max(1, int(options.get("concurrency", CONCURRENCY)))
+    same_host = options.get("same_host", True)
+    limiter = HostLimiter(int(options.get("per_host", PER_HOST_CONCURRENCY)), float(options.get("delay", POLITENESS_DELAY)))
+    loop = asyncio.get_event_loop()
+
+    start = normalize_url(start_url)
+    if start is None:
+        raise ValueError(f"Cannot crawl {start_url!r}: not an http(s) URL")
+    start_host = urlsplit(start).hostname
+    frontier = asyncio.Queue()
+    seen = {start}
+    frontier.put_nowait((start, 0, "listing", None))
+    profiles = []
+    stats = {"listing_pages": 0, "detail_pages": 0, "errors": 0, "truncated": False, "profiles": 0, "tiers": Counter()}
+    scheduled = Counter({"listing": 1})
+    fetched = 0
+    sink_error = None
+
+    def schedule(url, depth, kind, profile=None):
+        # Returns True when the page was queued
+        if url is None or url in seen:
+            return False
+        if same_host and urlsplit(url).hostname != start_host:
+            return False
+        if scheduled[kind] >= limits[kind]:
+            stats["truncated"] = True
+            return False
+        seen.add(url)
+        scheduled[kind] += 1
+        frontier.put_nowait((url, depth, kind, profile))
+        return True
+
+    async def deliver(items):
+        nonlocal sink_error
+        if not items or sink_error is not None:
+            return
+        try:
+            await sink(items)
+        except Exception as e:
+            sink_error = e
+
+    def stopped():
+        return job.cancelled or sink_error is not None
+
+    async def fetch(url):
+        host = urlsplit(url).hostname
+        await limiter.acquire(host)
+        try:
+            page = await fetch_page(url)
+        finally:
+            limiter.release(host)
+        stats["tiers"][page.tier] += 1
+        return page
+
+    async def enrich(url, profile):
+        page = await fetch(url)
+        text = await loop.run_in_executor(None, parse_detail, page.html, page.url)
+        for key, value in detail_fields(text).items():
+            # Fill gaps; a listing "email" without an address is replaced by the real one
+            if not profile.get(key) or (key == 'email' and '@' not in str(profile[key])):
+                profile[key] = value
+        profile['detail_url'] = page.url
+        stats["detail_pages"] += 1
+
+    async def visit(url, depth, kind, profile):
+        if kind == "detail":
+            try:
+                if not stopped():
+                    await enrich(url, profile)
+            finally:
+                if sink is not None:
+                    await deliver([profile])
+            return
+        if stopped():
+            return
+        page = await fetch(url)
+        found, next_urls = await loop.run_in_executor(None, parse_listing, page.html, page.url)
+        stats["listing_pages"] += 1
+        stats["profiles"] += len(found)
+        job.emit({"page": page.url, "profiles": found})
+        for next_url in next_urls:
+            schedule(next_url, depth, "listing")
+        ready = []
+        for item in found:
+            link = item.get('profile_link')
+            if not (depth < max_depth and link and schedule(normalize_url(link, page.url), depth + 1, "detail", item)):
+                ready.append(item)
+        if sink is None:
+            profiles.extend(found)
+        else:
+            await deliver(ready)
+
+    async def worker():
+        nonlocal fetched
+        while True:
+            url, depth, kind, profile = await frontier.get()
+            try:
+                await visit(url, depth, kind, profile)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                stats["errors"] += 1
+                print(f"[Crawler] {kind} page {url} failed: {e}")
+            finally:
+                fetched += 1
+                job.update(stage="crawl", progress=min(0.9, 0.9 * fetched / max(len(seen), 1)))
+                frontier.task_done()
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(concurrency)]
+    try:
+        await frontier.join()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+    if sink_error is not None:
+        raise sink_error
+    stats["tiers"] = dict(stats["tiers"])
+    stats["pages"] = fetched
+    return profiles, stats
@@ -0,0 +1,291 @@
+# --- Imports ---
+from bisect import bisect_right
+from bs4 import BeautifulSoup
+from bs4.element import NavigableString, Tag
+import lxml.html
+import os
+
+# "lxml" builds a plain lxml.html tree (much lighter than BeautifulSoup); "bs4" is the compatibility mode
+PARSERS = ("lxml", "bs4")
+DEFAULT_PARSER = os.getenv("PARSER_BACKEND", "lxml")
+
+
+class TextIndex:
+    """
+    One pass over a parsed document that records, for every element, its position
+    in document order and the slice of stripped text strings it covers.
+    `text(node)` matches `get_text(separator=' ', strip=True)` and is built at most once
+    per node; `word_count(node)` comes from prefix sums and never builds the text at all.
+    Subclasses adapt other tree backends by overriding the node accessors.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._strings = []
+        self._word_prefix = [0]
+        self._tags = []
+        # id(node) -> [preorder position, end of subtree in preorder, first string, end string]
+        self._info = {}
+        self._texts = {}
+        self._build(root)
+
+    # --- Backend accessors (BeautifulSoup) ---
+    def _contents(self, node):
+        # Child elements and direct text strings in document order
+        for child in node.children:
+            if isinstance(child, Tag):
+                yield child
+            elif type(child) is NavigableString:
+                # Same string types get_text() keeps: no comments, scripts, styles or CDATA
+                yield str(child)
+
+    def _is_element(self, item):
+        return isinstance(item, Tag)
+
+    def name(self, node):
+        return node.name
+
+    def parent(self, node):
+        return node.parent
+
+    def attr(self, node, key, default=None):
+        return node.get(key, default)
+
+    def children(self, node):
+        return [child for child in node.children if isinstance(child, Tag)]
+
+    # --- Single traversal ---
+    def _build(self, root):
+        strings, prefix, tags, info = self._strings, self._word_prefix, self._tags, self._info
+        info[id(root)] = [-1, 0, 0, 0]
+        stack = [(root, iter(self._contents(root)))]
+        while stack:
+            node, contents = stack[-1]
+            item = next(contents, None)
+            if item is None:
+                stack.pop()
+                entry = info[id(node)]
+                entry[1] = len(tags)
+                entry[3] = len(strings)
+            elif self._is_element(item):
+                info[id(item)] = [len(tags), 0, len(strings), 0]
+                tags.append(item)
+                stack.append((item, iter(self._contents(item))))
+            else:
+                text = item.strip()
+                if text:
+                    strings.append(text)
+                    prefix.append(prefix[-1] + len(text.split()))
+
+    @property
+    def node_count(self):
+        return len(self._tags)
+
+    def position(self, node):
+        # Preorder position; the document node itself is -1
+        return self._info[id(node)][0]
+
+    def subtree(self, node):
+        # (first, end) preorder positions covered by node and its descendants
+        entry = self._info[id(node)]
+        return entry[0], entry[1]
+
+    def span(self, node):
+        entry = self._info[id(node)]
+        return entry[2], entry[3]
+
+    def text(self, node, separator=' '):
+        start, end = self.span(node)
+        if separator != ' ':
+            return separator.join(self._strings[start:end])
+        key = id(node)
+        text = self._texts.get(key)
+        if text is None:
+            text = self._texts[key] = ' '.join(self._strings[start:end])
+        return text
+
+    def signature(self, node):
+        # Tag names, nesting, text and link targets of node's subtree: what the profile passes read there
+        entry = self._info[id(node)]
+        parts = []
+        for tag in [node] + self._tags[entry[0] + 1:entry[1]]:
+            info = self._info[id(tag)]
+            name = self.name(tag)
+            parts.append(f"{name} {info[1] - info[0]} {info[2] - entry[2]} {info[3] - entry[2]} {self.attr(tag, 'href') or '' if name == 'a' else ''}")
+        parts.extend(self._strings[entry[2]:entry[3]])
+        return "\x1f".join(parts)
+
+    def word_count(self, node):
+        start, end = self.span(node)
+        return self._word_prefix[end] - self._word_prefix[start]
+
+    def contains(self, ancestor, node):
+        outer, inner = self._info[id(ancestor)], self._info[id(node)]
+        return outer[0] < inner[0] < outer[1]
+
+    def find_all(self, names, root=None):
+        # Descendant elements of root (the whole document by default) in document order
+        names = {names} if isinstance(names, str) else set(names)
+        if root is None or root is self.root:
+            candidates = self._tags
+        else:
+            entry = self._info[id(root)]
+            candidates = self._tags[entry[0] + 1:entry[1]]
+        return [tag for tag in candidates if self.name(tag) in names]
+
+    def find(self, names, root=None):
+        names = {names} if isinstance(names, str) else set(names)
+        start, end = (0, len(self._tags)) if root is None or root is self.root else (self._info[id(root)][0] + 1, self._info[id(root)][1])
+        for i in range(start, end):
+            if self.name(self._tags[i]) in names:
+                return self._tags[i]
+        return None
+
+    def outermost_single(self, nodes):
+        """
+        Collapses nested candidate blocks. `nodes` are qualifying blocks in document order.
+        A block whose qualifying descendants form a single nested chain (a card and its
+        inner wrappers) is kept once, at its outermost level; a block that contains two or
+        more separate candidates is a list container and is dropped in favour of them.
+        """
+        parents = []
+        stack = []
+        for i, node in enumerate(nodes):
+            entry = self._info[id(node)]
+            while stack and self._info[id(nodes[stack[-1]])][1] <= entry[0]:
+                stack.pop()
+            parents.append(stack[-1] if stack else None)
+            stack.append(i)
+        leaves = [0] * len(nodes)
+        for i in range(len(nodes) - 1, -1, -1):
+            if leaves[i] == 0:
+                leaves[i] = 1
+            if parents[i] is not None:
+                leaves[parents[i]] += leaves[i]
+        covered = [False] * len(nodes)
+        kept = []
+        for i, node in enumerate(nodes):
+            parent = parents[i]
+            if parent is not None and covered[parent]:
+                covered[i] = True
+            elif leaves[i] == 1:
+                covered[i] = True
+                kept.append(node)
+        return kept
+
+
+class LxmlTextIndex(TextIndex):
+    """
+    Same index over an lxml.html tree. Text follows get_text(): comments are skipped
+    (their tails are kept) and script/style/template content is left out.
+    """
+
+    _SKIP_TEXT = frozenset(('script', 'style', 'template'))
+
+    def _contents(self, node):
+        if node.tag in self._SKIP_TEXT:
+            return
+        if node.text:
+            yield node.text
+        for child in node:
+            if isinstance(child.tag, str):
+                yield child
+            if child.tail:
+                yield child.tail
+
+    def _is_element(self, item):
+        return not isinstance(item, str)
+
+    def name(self, node):
+        return node.tag
+
+    def parent(self, node):
+        return node.getparent()
+
+    def attr(self, node, key, default=None):
+        return node.get(key, default)
+
+    def children(self, node):
+        return [child for child in node if isinstance(child.tag, str)]
+
+
+def parse_lxml_tree(html):
+    data = html.encode("utf-8") if isinstance(html, str) else html
+    try:
+        return lxml.html.document_fromstring(data, parser=lxml.html.HTMLParser(encoding="utf-8"))
+    except (lxml.etree.ParserError, ValueError):
+        # Empty or whitespace-only documents
+        return lxml.html.document_fromstring(b"<html></html>")
+
+
+def build_index(html, parser=DEFAULT_PARSER):
+    if parser not in PARSERS:
+        raise ValueError(f"parser must be one of {PARSERS}")
+    if parser == "lxml":
+        return LxmlTextIndex(parse_lxml_tree(html))
+    return TextIndex(BeautifulSoup(html, "lxml"))
+
+
+class Scope:
+    """
+    The part of a page a profile pass decides for: the subtrees of `roots`, or with
+    outside=True everything except them. Passes still read context (parent blocks,
+    table headers) from the whole index, so a decision made in a scope is the one the
+    whole-page pass would make. `spine` nodes never become card or block candidates.
+    """
+
+    def __init__(self, index, roots, outside=False, spine=()):
+        self.index = index
+        self.outside = outside
+        self.spine = {id(node) for node in spine}
+        self._ranges = sorted(index.subtree(node) for node in roots)
+        self._starts = [start for start, _ in self._ranges]
+        self._ancestors = []
+        node = index.parent(roots[0]) if roots and not outside else None
+        while node is not None and node is not index.root:
+            self._ancestors.append(node)
+            node = index.parent(node)
+
+    def __contains__(self, node):
+        position = self.index.position(node)
+        i = bisect_right(self._starts, position) - 1
+        return (i >= 0 and position < self._ranges[i][1]) != self.outside
+
+    def _slices(self):
+        tags = self.index._tags
+        if not self.outside:
+            return [tags[max(start, 0):end] for start, end in self._ranges]
+        slices, last = [], 0
+        for start, end in self._ranges:
+            slices.append(tags[last:max(start, last)])
+            last = max(last, end)
+        slices.append(tags[last:])
+        return slices
+
+    def find_all(self, names):
+        names = {names} if isinstance(names, str) else set(names)
+        name = self.index.name
+        return [tag for tags in self._slices() for tag in tags if name(tag) in names]
+
+    def links(self):
+        # Anchors whose link block (the anchor's parent) may lie in scope
+        return self.index.find_all('a') if self.outside else self.find_all('a')
+
+    def tables(self):
+        # Tables with rows in scope: those inside it and those enclosing its roots
+        inside = self.find_all('table')
+        enclosing = [node for node in reversed(self._ancestors) if self.index.name(node) == 'table']
+        return enclosing + inside
+
+    def rows(self, table):
+        # The table's rows after its first (header) row, as the whole-page pass reads them
+        if table in self and not self.outside:
+            return self.index.find_all('tr', root=table)[1:]
+        first = self.index.find('tr', root=table)
+        if self.outside:
+            return [tr for tr in self.index.find_all('tr', root=table) if tr is not first and tr in self]
+        return [tr for tr in self.find_all('tr') if tr is not first]
+
+
+def whole_scope(index):
+    return Scope(index, [index.root])
@@ -0,0 +1,366 @@
+# --- Imports ---
+from metrics import NULL_TRACE
+from normalize import normalize_profiles, STANDARD_COLS
+import csv
+import gzip
+import io
+import json
+import os
+import re
+import time
+
+# --- Export Settings (override through environment) ---
+EXPORT_FORMATS = ("xlsx", "csv", "jsonl", "parquet")
+COMPRESSIONS = ("gzip", "zstd")
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "20000"))
+ROW_GROUP_SIZE = int(os.getenv("EXPORT_ROW_GROUP_SIZE", "50000"))
+CHUNK_SIZE = 64 * 1024
+
+EXTENSIONS = {"xlsx": ".xlsx", "csv": ".csv", "jsonl": ".jsonl", "parquet": ".parquet"}
+COMPRESSED_EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
+MEDIA_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+    "gzip": "application/gzip",
+    "zstd": "application/zstd",
+}
+
+# Extraction results as tidy records: one per email/image, one per table cell
+DATA_COLUMNS = ["section", "table", "row", "column", "value"]
+INTEGER_COLUMNS = {"table", "row", "column"}
+# Incremental runs export only what changed since the last run
+DELTA_COLUMNS = ["change"] + STANDARD_COLS
+
+# --- Retention (override through environment) ---
+RETENTION_DAYS = float(os.getenv("EXPORT_RETENTION_DAYS", "7"))
+RETENTION_MAX_BYTES = int(float(os.getenv("EXPORT_RETENTION_MAX_MB", "1024")) * 1024 * 1024)
+# Export names are "<prefix>_<timestamp>_<job>.<ext>" (see extractor.export_target); the sweep of a
+# shared directory like static/ only matches those, so files other code put there stay
+EXPORT_PREFIXES = ("profiles_", "profiles_delta_", "extracted_")
+EXPORT_SUFFIXES = (".xlsx", ".csv", ".jsonl", ".parquet", ".gz", ".zst", ".part")
+
+_ILLEGAL_XLSX_CHARS = re.compile(r"[\000-\010]|[\013-\014]|[\016-\037]")
+
+
+def check_format(fmt, compression=None):
+    # Raises ValueError for combinations the writers cannot produce
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; use one of {', '.join(EXPORT_FORMATS)}")
+    if compression is not None and compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression {compression!r}; use one of {', '.join(COMPRESSIONS)}")
+    if compression and fmt == "xlsx":
+        raise ValueError("xlsx files are already zip-compressed; drop the compression option")
+
+
+def export_suffix(fmt, compression=None):
+    # Parquet compresses internally, so only the stream formats get a .gz/.zst suffix
+    suffix = EXTENSIONS[fmt]
+    if compression and fmt in ("csv", "jsonl"):
+        suffix += COMPRESSED_EXTENSIONS[compression]
+    return suffix
+
+
+def media_type(fmt, compression=None):
+    if compression and fmt in ("csv", "jsonl"):
+        return MEDIA_TYPES[compression]
+    return MEDIA_TYPES[fmt]
+
+
+def _open_stream(path, compression):
+    if compression == "gzip":
+        return gzip.open(path, "wb", compresslevel=6)
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("zstd compression needs the zstandard package")
+        return zstandard.ZstdCompressor(level=3).stream_writer(open(path, "wb"))
+    return open(path, "wb")
+
+
+class ExportWriter:
+    """
+    Writes rows to `path` as they arrive, holding at most one batch in memory:
+      csv / jsonl - encoded row by row into a plain, gzip or zstd stream
+      parquet     - buffered up to `row_group_size` rows, then written as one row group
+                    (gzip/zstd become the Parquet codec)
+      xlsx        - openpyxl write-only workbook, rows go straight to the sheet XML
+    Rows are dicts keyed by `columns` or sequences in column order. The file is written under
+    a ".part" name and renamed on close, so a half-written export is never served.
+    """
+
+    def __init__(self, path, fmt, columns, compression=None, row_group_size=ROW_GROUP_SIZE, sheet="data"):
+        check_format(fmt, compression)
+        self.path = path
+        self.fmt = fmt
+        self.columns = list(columns)
+        self.compression = compression
+        self.row_group_size = row_group_size
+        self.rows = 0
+        self._part = f"{path}.part"
+        self._buffer = []
+        self._stream = None
+        self._text = None
+        self._csv = None
+        self._parquet = None
+        self._workbook = None
+        self._sheet = None
+        if fmt in ("csv", "jsonl"):
+            self._stream = _open_stream(self._part, compression)
+            self._text = io.TextIOWrapper(self._stream, encoding="utf-8", newline="")
+            if fmt == "csv":
+                self._csv = csv.writer(self._text)
+                self._csv.writerow(self.columns)
+        elif fmt == "xlsx":
+            from openpyxl import Workbook
+            self._workbook = Workbook(write_only=True)
+            self.add_sheet(sheet, self.columns)
+
+    def add_sheet(self, name, columns):
+        # xlsx only: later rows go to a new worksheet with its own header
+        if self.fmt != "xlsx":
+            raise ValueError("Sheets are only supported for xlsx exports")
+        self.columns = list(columns)
+        self._sheet = self._workbook.create_sheet(title=str(name)[:31])
+        self._sheet.append(self.columns)
+
+    def _values(self, row):
+        if isinstance(row, dict):
+            return [row.get(col) for col in self.columns]
+        values = list(row)
+        return values + [None] * (len(self.columns) - len(values))
+
+    def write(self, row):
+        values = self._values(row)
+        self.rows += 1
+        if self.fmt == "jsonl":
+            self._text.write(json.dumps(dict(zip(self.columns, values)), ensure_ascii=False, default=str))
+            self._text.write("\n")
+        elif self.fmt == "csv":
+            self._csv.writerow(["" if v is None else v for v in values])
+        elif self.fmt == "xlsx":
+            self._sheet.append([_xlsx_cell(v) for v in values])
+        else:
+            self._buffer.append(values)
+            if len(self._buffer) >= self.row_group_size:
+                self._flush_row_group()
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def _flush_row_group(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        if self._parquet is None:
+            schema = pa.schema([
+                (col, pa.int64() if col in INTEGER_COLUMNS else pa.string()) for col in self.columns
+            ])
+            codec = self.compression or "snappy"
+            self._parquet = pq.ParquetWriter(self._part, schema, compression=codec)
+        columns = list(zip(*self._buffer)) if self._buffer else [[] for _ in self.columns]
+        arrays = [
+            pa.array(values, type=self._parquet.schema.field(col).type)
+            if col in INTEGER_COLUMNS else
+            pa.array([None if v is None else str(v) for v in values], type=pa.string())
+            for col, values in zip(self.columns, columns)
+        ]
+        self._parquet.write_table(pa.Table.from_arrays(arrays, schema=self._parquet.schema))
+        self._buffer = []
+
+    def close(self):
+        if self.fmt in ("csv", "jsonl"):
+            self._text.close()
+        elif self.fmt == "xlsx":
+            self._workbook.save(self._part)
+        else:
+            if self._buffer or self._parquet is None:
+                self._flush_row_group()
+            self._parquet.close()
+        os.replace(self._part, self.path)
+
+    def abort(self):
+        try:
+            if self._text is not None:
+                self._text.close()
+            if self._parquet is not None:
+                self._parquet.close()
+        except Exception:
+            pass
+        try:
+            os.remove(self._part)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def _xlsx_cell(value):
+    if value is None or isinstance(value, (int, float, bool)):
+        return value
+    return _ILLEGAL_XLSX_CHARS.sub("", str(value))
+
+
+class ProfileWriter:
+    """
+    Normalizes batches of profiles onto STANDARD_COLS and writes each one as it arrives;
+    exact dedup keys carry across batches, so a crawl can hand over each page's profiles.
+    Fuzzy dedup compares a name with every other one, so a `fuzzy` batch is only deduplicated
+    within itself: pass the whole list as one batch.
+    Normalizing and writing are separate "normalize"/"export" spans on `trace`.
+    """
+
+    def __init__(self, path, fmt="xlsx", compression=None, trace=None):
+        self.path = path
+        self.fmt = fmt
+        self.trace = trace or NULL_TRACE
+        self._writer = ExportWriter(path, fmt, STANDARD_COLS, compression)
+        self._seen = set()
+
+    @property
+    def rows(self):
+        return self._writer.rows
+
+    def write(self, profiles, fuzzy=False):
+        with self.trace.span("normalize", profiles=len(profiles), fuzzy=fuzzy) as span:
+            frame = normalize_profiles(profiles, fuzzy=fuzzy, seen=None if fuzzy else self._seen)
+            span.set(rows=len(frame))
+        with self.trace.span("export", format=self.fmt) as span:
+            self._writer.write_rows(frame.itertuples(index=False, name=None))
+            span.set(rows=len(frame))
+
+    def close(self):
+        try:
+            with self.trace.span("export", format=self.fmt, finalize=True) as span:
+                self._writer.close()
+                span.set(bytes=os.path.getsize(self.path))
+        except BaseException:
+            self.abort()
+            raise
+        return self.rows
+
+    def abort(self):
+        self._writer.abort()
+
+
+def export_profiles(profiles, path, fmt="xlsx", compression=None, fuzzy=False, batch_size=EXPORT_BATCH_SIZE, trace=None):
+    """
+    Writes a complete profile list through ProfileWriter, `batch_size` profiles at a time;
+    with `fuzzy` the whole list is normalized up front and only the writing is incremental.
+    Returns the number of rows written.
+    """
+    writer = ProfileWriter(path, fmt, compression, trace)
+    try:
+        batches = [profiles] if fuzzy else (profiles[i:i + batch_size] for i in range(0, len(profiles), batch_size))
+        for batch in batches:
+            writer.write(batch, fuzzy=fuzzy)
+        return writer.close()
+    except BaseException:
+        writer.abort()
+        raise
+
+
+def export_delta(delta, path, fmt="xlsx", compression=None, trace=None):
+    # One row per added, changed or removed record, tagged in the "change" column
+    with (trace or NULL_TRACE).span("export", format=fmt) as span:
+        with ExportWriter(path, fmt, DELTA_COLUMNS, compression) as writer:
+            for change in ("added", "changed", "removed"):
+                writer.write_rows(dict(record, change=change) for record in delta.get(change, []))
+        span.set(rows=writer.rows, bytes=os.path.getsize(path))
+    return writer.rows
+
+
+def data_rows(result):
+    for section in ("emails", "images"):
+        for i, value in enumerate(result.get(section) or []):
+            yield {"section": section, "row": i, "column": 0, "value": value}
+    for t, table in enumerate(result.get("tables") or []):
+        for r, cells in enumerate(table):
+            for c, value in enumerate(cells):
+                yield {"section": "tables", "table": t, "row": r, "column": c, "value": value}
+
+
+def export_data(result, path, fmt="xlsx", compression=None, trace=None):
+    """
+    Writes an extraction result. xlsx keeps one sheet per section (and per table);
+    the other formats get tidy DATA_COLUMNS records. Returns the number of rows written.
+    """
+    with (trace or NULL_TRACE).span("export", format=fmt) as span:
+        rows = _write_data(result, path, fmt, compression)
+        span.set(rows=rows, bytes=os.path.getsize(path))
+    return rows
+
+
+def _write_data(result, path, fmt, compression):
+    if fmt != "xlsx":
+        with ExportWriter(path, fmt, DATA_COLUMNS, compression) as writer:
+            writer.write_rows(data_rows(result))
+        return writer.rows
+    sheets = [(section, [section[:-1]], [[v] for v in result.get(section) or []]) for section in ("emails", "images") if section in result]
+    for t, table in enumerate(result.get("tables") or []):
+        width = max((len(cells) for cells in table), default=0)
+        sheets.append((f"table_{t + 1}", [f"col_{c}" for c in range(width)], table))
+    if not sheets:
+        sheets.append(("data", ["value"], []))
+    first, columns, rows = sheets[0]
+    with ExportWriter(path, "xlsx", columns, sheet=first) as writer:
+        writer.write_rows(rows)
+        for name, columns, rows in sheets[1:]:
+            writer.add_sheet(name, columns)
+            writer.write_rows(rows)
+    return writer.rows
+
+
+def iter_file(path, chunk_size=CHUNK_SIZE):
+    # Chunked reader for streaming downloads
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def cleanup_artifacts(locations, max_age=RETENTION_DAYS * 24 * 3600, max_bytes=RETENTION_MAX_BYTES):
+    """
+    `locations` is a list of (directory, prefixes, suffixes); only files whose names start with
+    one of the prefixes and end with one of the suffixes are considered. Deletes those older than
+    `max_age` seconds, then the oldest remaining ones until the rest fit in `max_bytes`.
+    Subdirectories are not entered; list them separately. Returns {"removed": files, "bytes": freed}.
+    """
+    files = []
+    for directory, prefixes, suffixes in locations:
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.is_file() and entry.name.startswith(prefixes) and entry.name.endswith(suffixes):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+    files.sort()
+    cutoff = time.time() - max_age
+    total = sum(size for _, size, _ in files)
+    removed = freed = 0
+    for mtime, size, path in files:
+        if mtime >= cutoff and total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+        freed += size
+    if removed:
+        print(f"[Export] Retention removed {removed} files ({freed / (1024 * 1024):.1f} MB)")
+    return {"removed": removed, "bytes": freed}
@@ -1,21 +1,33 @@
 # --- Imports ---
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
 from bs4 import BeautifulSoup
 import re
 import json
 import pandas as pd
 from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 import asyncio
 import time
 from fpdf import FPDF
 import os
+from browser_pool import browser_pool
+from readiness import READY_TIMEOUT, wait_for_ready, scroll_to_end, settle, check_cancel, RenderCancelled
+from fetcher import fetcher
+from keywords import matcher_for
+from dom_text import build_index, whole_scope, DEFAULT_PARSER
+from streaming import collect_data, measure
+from jobs import scheduler, sse_stream, JobError
+from crawl import crawl_profiles, find_next_pages, normalize_url
+from cache import page_cache, fetch_with_cache
+from render_profile import RenderProfile, resource_stats
+from metrics import Trace, NULL_TRACE, registry, check_profiler, PROFILE_DIR, PROFILE_SUFFIXES
+from export import check_format, export_suffix, media_type, export_profiles, export_data, export_delta, iter_file, cleanup_artifacts, ProfileWriter, EXPORT_PREFIXES, EXPORT_SUFFIXES
+from incremental import profile_store, sectioned_profiles, profile_delta
+from urllib.parse import urlsplit
+import functools
 
  # --- FastAPI Setup ---
 app = FastAPI()
@@ -31,55 +43,202 @@ static_dir_path = os.path.join(os.path.dirname(__file__), "static")
 os.makedirs(static_dir_path, exist_ok=True)
 from fastapi.staticfiles import StaticFiles
 app.mount("/static", StaticFiles(directory=static_dir_path), name="static")
+
+# --- Browser Pool, HTTP Client and Job Scheduler Lifecycle ---
+@app.on_event("startup")
+async def start_browser_pool():
+    loop = asyncio.get_event_loop()
+    await fetcher.start()
+    scheduler.start()
+    app.state.retention = asyncio.ensure_future(retention_loop())
+    await loop.run_in_executor(None, browser_pool.start)
+
+@app.on_event("shutdown")
+async def stop_browser_pool():
+    loop = asyncio.get_event_loop()
+    app.state.retention.cancel()
+    await scheduler.stop()
+    await fetcher.close()
+    await loop.run_in_executor(None, browser_pool.close)
 # --- Profile Extractor and PDF Maker ---
-def extract_profiles(url):
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--no-sandbox")
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
-    driver.get(url)
-    time.sleep(3)
-    # Scroll to bottom
-    for _ in range(3):
-        driver.execute_script("window.scrollBy(0, document.body.scrollHeight)")
-        time.sleep(1)
+# Link targets that are never individual profiles
+SKIP_HREF_PARTS = ('login', 'facebook', 'youtube', 'service', 'dashboard', 'charter', 'online', 'home', 'contact', 'news', 'report', 'noc', 'tender', 'library', 'repository', 'forms', 'barta', 'archive', 'performance', 'visitor', 'graduate', 'result', 'alumni', 'annual', 'footer')
+
+
+def render_profiles_page(url, wait_for=None, timeout=READY_TIMEOUT, profile=None, trace=None, cancel=None):
+    # `cancel` (a job's cancel_event) stops the waits below with RenderCancelled
+    profile = profile or RenderProfile()
+    with (trace or NULL_TRACE).span("render", url=url, profile=profile.name) as span:
+        lap = Lap(span)
+        with browser_pool.acquire() as driver:
+            lap("acquire_ms")
+            check_cancel(cancel)
+            # Blocks images/fonts/media/trackers per the render profile before anything is requested
+            profile.apply(driver)
+            driver.set_page_load_timeout(timeout * 2)
+            driver.get(url)
+            lap("navigate_ms")
+            wait_for_ready(driver, timeout=timeout, selector=wait_for, cancel=cancel)
+            lap("ready_ms")
+            # Scroll until lazy-loaded content stops growing the page
+            scroll_to_end(driver, timeout=timeout * 2, cancel=cancel)
+            lap("scroll_ms")
+            return finish_render(url, driver, profile, span)
+
+
+def extract_profiles(url, wait_for=None, timeout=READY_TIMEOUT, profile=None):
+    return parse_profiles(render_profiles_page(url, wait_for, timeout, profile), url)
+
+
+class Lap:
+    # Records the time since the previous lap (or the span's start) on a span, for the steps inside a render
+    def __init__(self, span):
+        self.span = span
+        self.last = span.started
+
+    def __call__(self, name):
+        now = time.perf_counter()
+        self.span.set(**{name: round((now - self.last) * 1000, 1)})
+        self.last = now
+
+
+def finish_render(url, driver, profile, span):
     html = driver.page_source
-    soup = BeautifulSoup(html, "lxml")
-    profiles = []
+    stats = resource_stats(driver)
+    span.set(bytes=len(html), requests=stats.get("requests"), transfer_bytes=stats.get("bytes"))
+    print(
+        f"[Render] {url} profile={profile.name} "
+        f"requests={stats.get('requests', '?')} kb={round(stats.get('bytes', 0) / 1024, 1)}"
+    )
+    return html
+
+
+def render_options(body):
+    # Returns (RenderProfile, None) or (None, error response) for the request's "render" option
+    try:
+        return RenderProfile.from_request(body.get("render")), None
+    except (ValueError, TypeError) as e:
+        return None, {"error": f"Invalid render option: {e}"}
+
+
+def parse_profiles(html, url=None, parser=DEFAULT_PARSER, trace=None):
+    # Text and word counts for every node are computed in one pass and shared by all strategies below
+    index = traced_index(html, parser, trace)
+    with (trace or NULL_TRACE).span("classify", url=url) as span:
+        profiles = profiles_from_index(index, url)
+        span.set(profiles=len(profiles))
+    return profiles
+
+
+def parse_listing(html, url=None, parser=DEFAULT_PARSER, trace=None):
+    # One parse feeds both the profile heuristics and pagination discovery during a crawl
+    index = traced_index(html, parser, trace)
+    with (trace or NULL_TRACE).span("classify", url=url) as span:
+        profiles, next_pages = profiles_from_index(index, url), find_next_pages(index, url)
+        span.set(profiles=len(profiles), next_pages=len(next_pages))
+    return profiles, next_pages
+
+
+def parse_page_text(html, url=None, parser=DEFAULT_PARSER, trace=None):
+    index = traced_index(html, parser, trace)
+    return index.text(index.root)
+
+
+def parse_sections(html, url=None, parser=DEFAULT_PARSER, trace=None, reuse=True):
+    # Incremental mode: page sections seen before reuse their stored profiles, only new ones are classified
+    index = traced_index(html, parser, trace)
+    with (trace or NULL_TRACE).span("classify", url=url) as span:
+        profiles, stats = sectioned_profiles(
+            index, html, url, profiles_from_index, PROFILE_PASSES, matcher_for(url), profile_store, section_options(url, parser), reuse
+        )
+        span.set(profiles=len(profiles), **stats)
+    return profiles
+
+
+def parse_listing_sections(html, url=None, parser=DEFAULT_PARSER, trace=None, reuse=True):
+    index = traced_index(html, parser, trace)
+    with (trace or NULL_TRACE).span("classify", url=url) as span:
+        profiles, stats = sectioned_profiles(
+            index, html, url, profiles_from_index, PROFILE_PASSES, matcher_for(url), profile_store, section_options(url, parser), reuse
+        )
+        next_pages = find_next_pages(index, url)
+        span.set(profiles=len(profiles), next_pages=len(next_pages), **stats)
+    return profiles, next_pages
+
+
+def section_options(url, parser):
+    # Keyword matchers are per host, so stored sections are too
+    return {"parser": parser, "host": urlsplit(url).hostname if url else None}
+
+
+def traced_index(html, parser, trace):
+    with (trace or NULL_TRACE).span("parse", parser=parser, bytes=len(html)) as span:
+        index = build_index(html, parser)
+        span.set(nodes=index.node_count)
+    return index
+
+
+# Fewer link profiles than this and the table/card pass runs too
+MIN_LINK_PROFILES = 5
+
+
+def profiles_from_index(index, url=None, run_pass=None):
+    """
+    Runs the strategies below with their page-wide thresholds. run_pass(name) -> [(key, profile)]
+    runs one of PROFILE_PASSES; by default over the whole page, in incremental mode section
+    by section (see incremental.SectionedPasses), ordered by key as the whole-page pass orders them.
+    """
+    if run_pass is None:
+        # Keyword automaton is built once per domain and reused for every node
+        matcher = matcher_for(url)
+        scope = whole_scope(index)
+
+        def run_pass(name):
+            return PROFILE_PASSES[name](index, matcher, scope)[0]
     # Universal profile extraction: look for repeated containers (links, cards, rows, divs)
-    profiles = []
-    # Try to find profile blocks by common patterns
     # 1. Links to details pages (faculty, employee, etc.)
-    # Try links first (for sites that use them)
-    found_profiles = 0
-    profile_links = soup.find_all('a', href=True)
-    profile_keywords = [
-        'professor', 'lecturer', 'doctor', 'department', 'faculty', 'designation', 'specialty', 'hospital', 'chamber',
-        'contact', 'email', 'phone', 'research', 'publication', 'employee', 'staff', 'teacher', 'medical', 'clinic', 'practice', 'biography', 'cv', 'resume', 'name', 'qualification', 'experience', 'address', 'mobile', 'office', 'division', 'unit', 'section', 'group', 'role', 'title', 'position', 'subject', 'field', 'area', 'expertise', 'interest', 'profile', 'bio', 'about'
-    ]
-    navigation_keywords = [
-        'academics', 'academic', 'programs', 'admission', 'libraries', 'bodies', 'institutes', 'constituent', 'affiliated', 'calendar', 'undergraduate', 'graduate', 'mphil', 'phd', 'international students', 'service', 'footer', 'home', 'about', 'news', 'events', 'contact', 'login', 'register', 'search', 'menu', 'sidebar', 'navigation', 'copyright', 'disclaimer', 'privacy', 'terms', 'departments', 'faculty', 'staff', 'employee', 'directory', 'list', 'members', 'committee', 'board', 'administration', 'management', 'office', 'unit', 'division', 'section', 'group', 'organization', 'org', 'orgs', 'people', 'personnel', 'team', 'teams', 'overview', 'info', 'information', 'details', 'resources', 'links', 'site', 'web', 'webpage', 'page', 'pages', 'main', 'general', 'profile', 'profiles', 'bio', 'bios', 'about'
-    ]
+    profiles = [profile for _, profile in run_pass("links")]
+    # 2. If not enough profiles found, scan for repeated blocks and table rows/cards
+    if len(profiles) < MIN_LINK_PROFILES:
+        profiles += [profile for _, profile in run_pass("blocks")]
+    # 3. If no profiles found, try to find repeated divs or rows
+    if not profiles:
+        profiles = [profile for _, profile in run_pass("fallback")]
+    print(f"[Profile Extractor] Found {len(profiles)} profiles.")
+    if profiles:
+        print(f"[Profile Extractor] Sample profile: {profiles[0]}")
+    return profiles
+
+
+# --- Profile Passes ---
+# Each pass decides only for nodes in `scope` (dom_text.Scope) but reads context from the whole index.
+# Returns (found, kept, spine): found is [(key, profile)] with key = (group, preorder positions...),
+# kept the blocks outermost_single kept and spine the scope.spine nodes that qualified as candidates.
+def link_profiles(index, matcher, scope):
+    # Links to details pages (faculty, employee, etc.); sites that use them are tried first
+    found = []
+    profile_links = [a for a in scope.links() if index.attr(a, 'href') is not None]
     for a_tag in profile_links:
-        text = a_tag.get_text(strip=True)
-        href = a_tag['href']
-        block = a_tag.parent
-        if block and block.name == 'a':
-            block = block.parent
-        block_text = block.get_text(separator=' ', strip=True) if block else text
+        text = index.text(a_tag, separator='')
+        href = index.attr(a_tag, 'href')
+        block = index.parent(a_tag)
+        if block is not None and index.name(block) == 'a':
+            block = index.parent(block)
+        # The decision rests on the link's block, so the block's scope owns it
+        if (block if block is not None else a_tag) not in scope:
+            continue
+        block_text = index.text(block) if block is not None else text
         main_text = block_text.split('\n')[0] if block_text else ''
         # Stricter filtering: skip navigation, social, empty links, blocks without profile keywords, blocks with navigation keywords, and invalid links/main_text
-        def is_navigation(text):
-            return any(re.search(r'\b' + re.escape(nav_kw) + r'\b', text.lower()) for nav_kw in navigation_keywords)
         if (
             not text or len(text) < 5 or
-            any(x in href for x in ['login', 'facebook', 'youtube', 'service', 'dashboard', 'charter', 'online', 'home', 'contact', 'news', 'report', 'noc', 'tender', 'library', 'repository', 'forms', 'barta', 'archive', 'performance', 'visitor', 'graduate', 'result', 'alumni', 'annual', 'footer']) or
-            not any(re.search(r'\b' + re.escape(kw) + r'\b', block_text.lower()) for kw in profile_keywords) or
-            is_navigation(block_text) or
-            href == '#' or not href.strip() or not main_text.strip() or is_navigation(main_text)
+            any(x in href for x in SKIP_HREF_PARTS) or
+            href == '#' or not href.strip() or not main_text.strip()
         ):
             continue
+        profile_hits, nav_hits = matcher.classify(block_text)
+        if not profile_hits or nav_hits or (main_text != block_text and matcher.is_navigation(main_text)):
+            continue
         # Auto-detect key-value pairs, require at least 2 fields (besides main_text, profile_link, block_text)
         profile = {'main_text': main_text, 'profile_link': href, 'block_text': block_text}
         field_count = 0
@@ -92,109 +251,292 @@ def extract_profiles(url):
                     profile[key] = value
                     field_count += 1
         if field_count >= 2:
-            profiles.append(profile)
-            found_profiles += 1
-    # If not enough profiles found, scan for repeated blocks and table rows/cards
-    if found_profiles < 5:
-        # Table row extraction (for faculty lists, doctor lists, etc.)
-        for table in soup.find_all('table'):
-            headers = []
-            # Try to get headers from thead or first row
-            thead = table.find('thead')
-            if thead:
-                headers = [th.get_text(strip=True).lower().replace(' ', '_') for th in thead.find_all('th')]
+            found.append(((0, index.position(a_tag)), profile))
+    return found, [], []
+
+
+def block_profiles(index, matcher, scope):
+    # Table rows first (group 0, by table then row), then card/div blocks (group 1)
+    found = []
+    # Table row extraction (for faculty lists, doctor lists, etc.)
+    table_rows = set()
+    for table in scope.tables():
+        headers = []
+        # Try to get headers from thead or first row
+        thead = index.find('thead', root=table)
+        if thead is not None:
+            headers = [index.text(th, separator='').lower().replace(' ', '_') for th in index.find_all('th', root=thead)]
+        else:
+            first_row = index.find('tr', root=table)
+            if first_row is not None:
+                headers = [index.text(td, separator='').lower().replace(' ', '_') for td in index.find_all(['th', 'td'], root=first_row)]
+        for tr in scope.rows(table):
+            cells = index.find_all(['td', 'th'], root=tr)
+            if len(cells) >= 2:
+                profile = {}
+                for idx, cell in enumerate(cells):
+                    value = index.text(cell)
+                    key = headers[idx] if idx < len(headers) else f'field_{idx+1}'
+                    # Try to map common headers to standard categories
+                    if key in ['name', 'doctor_name', 'faculty_name', 'professor_name']:
+                        key = 'name'
+                    elif key in ['designation', 'title', 'position', 'role']:
+                        key = 'designation'
+                    elif key in ['hospital', 'institute', 'department', 'division', 'unit', 'section']:
+                        key = 'organization'
+                    elif key in ['email', 'e-mail', 'mail']:
+                        key = 'email'
+                    elif key in ['phone', 'mobile', 'contact']:
+                        key = 'phone'
+                    profile[key] = value
+                if matcher.has_profile(' '.join(profile.values())):
+                    found.append(((0, index.position(table), index.position(tr)), profile))
+                    table_rows.add(id(tr))
+    # Card/div block extraction (for doctor cards, etc.)
+    candidates = []
+    spine = []
+    for block in scope.find_all(['div', 'li', 'tr']):
+        # Rows already taken by the table pass still count as candidates so their containers collapse
+        if id(block) in table_rows:
+            qualifies = True
+        # Flexible: treat as profile if block has enough words, contains profile keywords, and is not navigation
+        elif index.word_count(block) <= 8:
+            continue
+        else:
+            block_text = index.text(block)
+            main_text = block_text.split('\n')[0]
+            if not main_text.strip():
+                continue
+            profile_hits, nav_hits = matcher.classify(block_text)
+            qualifies = profile_hits and not nav_hits and not (main_text != block_text and matcher.is_navigation(main_text))
+        if qualifies:
+            (spine if id(block) in scope.spine else candidates).append(block)
+    # One profile per card, not one per wrapping ancestor
+    kept = index.outermost_single(candidates)
+    for block in kept:
+        if id(block) in table_rows:
+            continue
+        block_text = index.text(block)
+        main_text = block_text.split('\n')[0]
+        profile = {'main_text': main_text, 'block_text': block_text}
+        # Try to split by common delimiters to infer fields
+        parts = re.split(r'[;\n,|\-]', block_text)
+        # Pattern matching for common profile fields
+        for idx, part in enumerate(parts):
+            kv_match = re.match(r'\s*([\w\s\-]+)\s*[:：]\s*(.+)', part)
+            if kv_match:
+                key = kv_match.group(1).strip().lower().replace(' ', '_')
+                value = kv_match.group(2).strip()
+                # Map to standard categories
+                if key in ['name', 'doctor_name', 'faculty_name', 'professor_name']:
+                    key = 'name'
+                elif key in ['designation', 'title', 'position', 'role']:
+                    key = 'designation'
+                elif key in ['hospital', 'institute', 'department', 'division', 'unit', 'section']:
+                    key = 'organization'
+                elif key in ['email', 'e-mail', 'mail']:
+                    key = 'email'
+                elif key in ['phone', 'mobile', 'contact']:
+                    key = 'phone'
+                profile[key] = value
             else:
-                first_row = table.find('tr')
-                if first_row:
-                    headers = [td.get_text(strip=True).lower().replace(' ', '_') for td in first_row.find_all(['th', 'td'])]
-            for tr in table.find_all('tr')[1:]:
-                cells = tr.find_all(['td', 'th'])
-                if len(cells) >= 2:
-                    profile = {}
-                    for idx, cell in enumerate(cells):
-                        value = cell.get_text(separator=' ', strip=True)
-                        key = headers[idx] if idx < len(headers) else f'field_{idx+1}'
-                        # Try to map common headers to standard categories
-                        if key in ['name', 'doctor_name', 'faculty_name', 'professor_name']:
-                            key = 'name'
-                        elif key in ['designation', 'title', 'position', 'role']:
-                            key = 'designation'
-                        elif key in ['hospital', 'institute', 'department', 'division', 'unit', 'section']:
-                            key = 'organization'
-                        elif key in ['email', 'e-mail', 'mail']:
-                            key = 'email'
-                        elif key in ['phone', 'mobile', 'contact']:
-                            key = 'phone'
-                        profile[key] = value
-                    if any(re.search(r'\b' + re.escape(kw) + r'\b', ' '.join(profile.values()).lower()) for kw in profile_keywords):
-                        profiles.append(profile)
-        # Card/div block extraction (for doctor cards, etc.)
-        block_tags = soup.find_all(['div', 'li', 'tr'])
-        for block in block_tags:
-            block_text = block.get_text(separator=' ', strip=True)
-            main_text = block_text.split('\n')[0] if block_text else ''
-            def is_navigation(text):
-                return any(re.search(r'\b' + re.escape(nav_kw) + r'\b', text.lower()) for nav_kw in navigation_keywords)
-            # Flexible: treat as profile if block has enough words, contains profile keywords, and is not navigation
-            if (
-                block_text and len(block_text.split()) > 8 and
-                any(re.search(r'\b' + re.escape(kw) + r'\b', block_text.lower()) for kw in profile_keywords) and
-                not is_navigation(block_text) and
-                main_text.strip() and not is_navigation(main_text)
-            ):
-                profile = {'main_text': main_text, 'block_text': block_text}
-                # Try to split by common delimiters to infer fields
-                parts = re.split(r'[;\n,|\-]', block_text)
-                # Pattern matching for common profile fields
-                for idx, part in enumerate(parts):
-                    kv_match = re.match(r'\s*([\w\s\-]+)\s*[:：]\s*(.+)', part)
-                    if kv_match:
-                        key = kv_match.group(1).strip().lower().replace(' ', '_')
-                        value = kv_match.group(2).strip()
-                        # Map to standard categories
-                        if key in ['name', 'doctor_name', 'faculty_name', 'professor_name']:
-                            key = 'name'
-                        elif key in ['designation', 'title', 'position', 'role']:
-                            key = 'designation'
-                        elif key in ['hospital', 'institute', 'department', 'division', 'unit', 'section']:
-                            key = 'organization'
-                        elif key in ['email', 'e-mail', 'mail']:
-                            key = 'email'
-                        elif key in ['phone', 'mobile', 'contact']:
-                            key = 'phone'
-                        profile[key] = value
-                    else:
-                        value = part.strip()
-                        # Heuristic: assign by position if not key-value
-                        if idx == 0 and value:
-                            profile['name'] = value
-                        elif idx == 1 and value:
-                            profile['designation'] = value
-                        elif idx == 2 and value:
-                            profile['organization'] = value
-                        elif value and len(value.split()) > 1:
-                            field_name = f'field_{idx+1}'
-                            profile[field_name] = value
-                profiles.append(profile)
-    # If no profiles found, try to find repeated divs or rows
-    if not profiles:
-        for div in soup.find_all(['div', 'tr', 'li']):
-            div_text = div.get_text(separator=' ', strip=True)
-            if div_text and len(div_text.split()) > 5:
-                profile = {'block_text': div_text}
-                for part in re.split(r'[;\n]', div_text):
-                    kv_match = re.match(r'\s*([\w\s\-]+)\s*[:：]\s*(.+)', part)
-                    if kv_match:
-                        key = kv_match.group(1).strip().lower().replace(' ', '_')
-                        value = kv_match.group(2).strip()
-                        if key and value:
-                            profile[key] = value
-                profiles.append(profile)
-    print(f"[Profile Extractor] Found {len(profiles)} profiles.")
-    if profiles:
-        print(f"[Profile Extractor] Sample profile: {profiles[0]}")
-    driver.quit()
-    return profiles
+                value = part.strip()
+                # Heuristic: assign by position if not key-value
+                if idx == 0 and value:
+                    profile['name'] = value
+                elif idx == 1 and value:
+                    profile['designation'] = value
+                elif idx == 2 and value:
+                    profile['organization'] = value
+                elif value and len(value.split()) > 1:
+                    field_name = f'field_{idx+1}'
+                    profile[field_name] = value
+        found.append(((1, index.position(block)), profile))
+    return found, kept, spine
+
+
+def fallback_profiles(index, matcher, scope):
+    # Last resort: repeated divs or rows with a few words each
+    found = []
+    candidates = []
+    spine = []
+    for div in scope.find_all(['div', 'tr', 'li']):
+        if index.word_count(div) > 5:
+            (spine if id(div) in scope.spine else candidates).append(div)
+    kept = index.outermost_single(candidates)
+    for div in kept:
+        div_text = index.text(div)
+        profile = {'block_text': div_text}
+        for part in re.split(r'[;\n]', div_text):
+            kv_match = re.match(r'\s*([\w\s\-]+)\s*[:：]\s*(.+)', part)
+            if kv_match:
+                key = kv_match.group(1).strip().lower().replace(' ', '_')
+                value = kv_match.group(2).strip()
+                if key and value:
+                    profile[key] = value
+        found.append(((0, index.position(div)), profile))
+    return found, kept, spine
+
+
+PROFILE_PASSES = {"links": link_profiles, "blocks": block_profiles, "fallback": fallback_profiles}
+
+
+async def parse_memoized(page, kind, memo_options, refresh, trace, fn, *args):
+    # Unchanged pages (same content hash) reuse the stored extraction instead of parsing again
+    loop = asyncio.get_event_loop()
+    if not refresh:
+        with trace.span("memo", kind=kind) as span:
+            cached = await loop.run_in_executor(None, page_cache.get_result, page.content_hash, kind, memo_options)
+            span.set(hit=cached is not None)
+        if cached is not None:
+            return cached, {"memoized": True}
+    result, stats = await loop.run_in_executor(None, functools.partial(measure, trace.profiled(fn), *args, trace=trace))
+    await loop.run_in_executor(None, page_cache.put_result, page.content_hash, kind, memo_options, result)
+    return result, stats
+
+
+async def run_profiles_job(job):
+    body = job.params
+    # Optional readiness controls: CSS selector to wait for and per-request timeout (seconds)
+    wait_for = body.get("wait_for")
+    timeout = float(body.get("timeout", READY_TIMEOUT))
+    # "auto" tries plain HTTP first and only renders in Chrome when the HTML looks incomplete
+    fetch_mode = body.get("fetch_mode", "auto")
+    parser = body.get("parser", DEFAULT_PARSER)
+    # Pages and parsed results come from the cache unless the client forces a refresh
+    refresh = bool(body.get("refresh", False))
+    # Stage spans go into the response and /metrics; "profiler" also profiles the blocking stages
+    trace = Trace(job.kind, body.get("profiler"))
+    profile, _ = render_options(body)
+    # Renders poll the job's cancel_event, and the scheduler keeps the domain slot until they return
+    render = job.in_thread(trace.profiled(functools.partial(
+        render_profiles_page, wait_for=wait_for, timeout=timeout, profile=profile, trace=trace, cancel=job.cancel_event
+    )))
+    cache_options = {"kind": "profiles", "wait_for": wait_for, "render": profile.to_dict()}
+    loop = asyncio.get_event_loop()
+    # "incremental" keeps the previous run in the profile store and exports only added/changed/removed records
+    incremental = bool(body.get("incremental", False))
+    fmt, compression = body.get("format", "xlsx"), body.get("compression")
+    # "fuzzy_dedup" also merges names that differ only in titles, punctuation or spacing
+    fuzzy = bool(body.get("fuzzy_dedup", False))
+    crawl_options = body.get("crawl")
+    # A crawl's profiles are exported page by page as they come in. Fuzzy dedup and the incremental
+    # delta need the whole list, so with either of them the export runs after the crawl.
+    stream = bool(crawl_options) and not (incremental or fuzzy)
+    writer = None
+    if crawl_options:
+        # Crawl mode: follow pagination to the end and optionally enrich from each profile's detail page
+        listing = functools.partial(parse_listing_sections, reuse=not refresh) if incremental else parse_listing
+        sink = None
+        if stream:
+            filename, filepath = export_target("profiles", job, fmt, compression)
+            writer = ProfileWriter(filepath, fmt, compression, trace=trace)
+            write = trace.profiled(writer.write)
+            write_lock = asyncio.Lock()
+
+            async def sink(found):
+                # One write at a time: the writer is not thread-safe
+                async with write_lock:
+                    await loop.run_in_executor(None, write, found)
+        try:
+            profiles, crawl_stats = await crawl_profiles(
+                job, job.url,
+                lambda page_url: traced_fetch(trace, page_url, render, fetch_mode, cache_options, refresh),
+                trace.profiled(functools.partial(listing, parser=parser, trace=trace)),
+                trace.profiled(functools.partial(parse_page_text, parser=parser, trace=trace)),
+                crawl_options,
+                sink=sink,
+            )
+            if stream and not crawl_stats["profiles"]:
+                raise JobError("No profiles found.")
+        except BaseException:
+            if writer is not None:
+                writer.abort()
+            raise
+        tier = max(crawl_stats["tiers"], key=crawl_stats["tiers"].get) if crawl_stats["tiers"] else None
+        parse_stats = {"parser": parser, "crawl": crawl_stats}
+    else:
+        job.update(stage="fetch", progress=0.1)
+        page = await traced_fetch(trace, job.url, render, fetch_mode, cache_options, refresh)
+        job.update(stage="parse", progress=0.5)
+        memo_options = {"parser": parser, "host": urlsplit(page.url).hostname}
+        if incremental:
+            profiles, parse_stats = await parse_memoized(
+                page, "profiles_sections", memo_options, refresh, trace,
+                functools.partial(parse_sections, reuse=not refresh), page.html, page.url, parser,
+            )
+        else:
+            profiles, parse_stats = await parse_memoized(page, "profiles", memo_options, refresh, trace, parse_profiles, page.html, page.url, parser)
+        parse_stats["parser"] = parser
+        parse_stats["cache"] = page.cache
+        tier = page.tier
+        job.emit({"profiles": profiles})
+    if not (profiles or stream):
+        raise JobError("No profiles found.")
+    job.update(stage="export", progress=0.9)
+    result = {"tier": tier, "parse_stats": parse_stats, "profile_count": crawl_stats["profiles"] if stream else len(profiles)}
+    if stream:
+        rows = await loop.run_in_executor(None, trace.profiled(writer.close))
+    elif incremental:
+        # A crawl that lost pages, hit a page limit or was cancelled cannot tell a removed profile from an unfetched one
+        complete = not job.cancelled and (not crawl_options or not (crawl_stats["errors"] or crawl_stats["truncated"]))
+        delta = await loop.run_in_executor(None, trace.profiled(functools.partial(
+            profile_delta, profile_store, normalize_url(job.url) or job.url, profiles, fuzzy, complete, trace=trace
+        )))
+        filename, filepath = export_target("profiles_delta", job, fmt, compression)
+        rows = await loop.run_in_executor(None, trace.profiled(functools.partial(
+            export_delta, delta, filepath, fmt, compression, trace=trace
+        )))
+        result["delta"] = {change: len(delta[change]) for change in ("added", "changed", "removed")}
+        result["delta"].update(unchanged=delta["unchanged"], removals_applied=complete)
+    else:
+        filename, filepath = export_target("profiles", job, fmt, compression)
+        rows = await loop.run_in_executor(None, trace.profiled(functools.partial(
+            export_profiles, profiles, filepath, fmt, compression, fuzzy, trace=trace
+        )))
+    result.update(export_links(job, filename, fmt, compression, rows))
+    result["trace"] = trace.finish(f"{job.kind}_{job.id[:8]}")
+    return result
+
+
+async def traced_fetch(trace, url, render, fetch_mode, cache_options, refresh):
+    # The "fetch" span covers cache lookup, HTTP and (when needed) the browser render, which adds its own span
+    with trace.span("fetch", url=url) as span:
+        page = await fetch_with_cache(fetcher, url, render, fetch_mode, cache_options, refresh)
+        span.set(tier=page.tier, cache=page.cache, status=page.status, bytes=len(page.html))
+    return page
+
+
+# --- Export Files ---
+def export_target(prefix, job, fmt, compression):
+    # Exports are written straight into static/ under a per-job name
+    from datetime import datetime
+    filename = f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{job.id[:8]}{export_suffix(fmt, compression)}"
+    return filename, os.path.join(static_dir_path, filename)
+
+
+def export_links(job, filename, fmt, compression, rows):
+    links = {
+        "export_file": filename,
+        "export_url": f"/static/{filename}",
+        "download_url": f"/jobs/{job.id}/download",
+        "format": fmt,
+        "compression": compression,
+        "rows": rows,
+    }
+    if fmt == "xlsx":
+        links["excel_url"] = links["export_url"]
+    return links
+
+
+def option_errors(body):
+    # Returns an error response for an unsupported format/compression, render option or profiler, None when the body is fine
+    try:
+        check_format(body.get("format", "xlsx"), body.get("compression"))
+        check_profiler(body.get("profiler"))
+    except ValueError as e:
+        return {"error": str(e)}
+    return render_options(body)[1]
 
 
 @app.post("/profile_excel")
@@ -203,162 +545,259 @@ async def profile_excel(request: Request):
     url = body.get("url")
     if not url:
         return {"error": "No URL provided."}
-    import concurrent.futures
-    loop = asyncio.get_event_loop()
-    with concurrent.futures.ThreadPoolExecutor() as pool:
-        profiles = await loop.run_in_executor(pool, extract_profiles, url)
-    if not profiles:
-        return {"error": "No profiles found."}
-
-    from datetime import datetime
-    filename = f"profiles_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    filepath = filename
-    save_excel(profiles, filepath)
-    static_dir = os.path.join(os.path.dirname(__file__), 'static')
-    os.makedirs(static_dir, exist_ok=True)
-    os.replace(filepath, os.path.join(static_dir, filename))
-    excel_url = f"/static/{filename}"
-    return {"excel_url": excel_url}
+    error = option_errors(body)
+    if error:
+        return error
+    # Returns immediately; poll /jobs/{job_id} or stream /jobs/{job_id}/events for the result
+    job = scheduler.submit("profile_excel", url, run_profiles_job, params=body, priority=int(body.get("priority", 0)))
+    return job_links(job)
 # --- Dynamic Extraction Function ---
-def extract_data(url, data_types=["emails", "images", "tables"]):
-    try:
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--no-sandbox")
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+def render_data_page(url, wait_for=None, timeout=READY_TIMEOUT, profile=None, trace=None, cancel=None):
+    profile = profile or RenderProfile()
+    # Driver always goes back to the pool, even when a step below fails or the job is cancelled
+    with (trace or NULL_TRACE).span("render", url=url, profile=profile.name) as span, browser_pool.acquire() as driver:
+        lap = Lap(span)
+        lap("acquire_ms")
+        check_cancel(cancel)
+        profile.apply(driver)
+        driver.set_page_load_timeout(timeout * 2)
         driver.get(url)
-        time.sleep(3)
-        # Scroll to bottom
-        for _ in range(3):
-            driver.execute_script("window.scrollBy(0, document.body.scrollHeight)")
-            time.sleep(1)
+        lap("navigate_ms")
+        wait_for_ready(driver, timeout=timeout, selector=wait_for, cancel=cancel)
+        lap("ready_ms")
+        # Scroll until lazy-loaded content stops growing the page
+        scroll_to_end(driver, timeout=timeout * 2, cancel=cancel)
+        lap("scroll_ms")
         # Click 'Load more', 'Show more', etc.
         for btn in driver.find_elements(By.XPATH, "//button|//a"):
+            check_cancel(cancel)
             try:
                 text = btn.text.lower()
                 if any(x in text for x in ["load more", "show more", "more", "next"]):
                     btn.click()
-                    time.sleep(1)
+                    settle(driver, timeout=timeout, cancel=cancel)
+            except RenderCancelled:
+                raise
             except Exception:
                 pass
         # Try to close popups/modals
         for sel in ["button[aria-label='close']", "button.close", ".modal-close", ".popup-close"]:
+            check_cancel(cancel)
             try:
                 for btn in driver.find_elements(By.CSS_SELECTOR, sel):
                     btn.click()
-                    time.sleep(0.5)
+                    settle(driver, timeout=timeout, cancel=cancel)
+            except RenderCancelled:
+                raise
             except Exception:
                 pass
-        html = driver.page_source
-        soup = BeautifulSoup(html, "lxml")
-        result = {}
-        if "emails" in data_types:
-            result["emails"] = list(set(re.findall(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b", html)))
-        if "images" in data_types:
-            result["images"] = [img['src'] for img in soup.find_all("img") if img.get("src")]
-        if "tables" in data_types:
-            tables = []
-            for table in soup.find_all("table"):
-                rows = []
-                for tr in table.find_all("tr"):
-                    cells = [td.get_text(strip=True) for td in tr.find_all(["td", "th"])]
-                    rows.append(cells)
-                tables.append(rows)
-            result["tables"] = tables
-        driver.quit()
-        return result
+        lap("interact_ms")
+        return finish_render(url, driver, profile, span)
+
+
+def parse_data(html, data_types=["emails", "images", "tables"], parser=DEFAULT_PARSER, trace=None):
+    # Parsing and extraction are one pass here, so the whole call is the "parse" stage
+    with (trace or NULL_TRACE).span("parse", parser=parser, bytes=len(html)) as span:
+        result = parse_data_untraced(html, data_types, parser)
+        span.set(rows=sum(len(v) for v in result.values()))
+    return result
+
+
+def parse_data_untraced(html, data_types, parser):
+    # lxml streams the document once; BeautifulSoup is kept as a compatibility mode for comparing results
+    if parser == "lxml":
+        return collect_data(html, data_types)
+    soup = BeautifulSoup(html, "lxml")
+    result = {}
+    if "emails" in data_types:
+        result["emails"] = list(set(re.findall(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b", html)))
+    if "images" in data_types:
+        result["images"] = [img['src'] for img in soup.find_all("img") if img.get("src")]
+    if "tables" in data_types:
+        tables = []
+        for table in soup.find_all("table"):
+            rows = []
+            for tr in table.find_all("tr"):
+                cells = [td.get_text(strip=True) for td in tr.find_all(["td", "th"])]
+                rows.append(cells)
+            tables.append(rows)
+        result["tables"] = tables
+    return result
+
+
+def extract_data(url, data_types=["emails", "images", "tables"], wait_for=None, timeout=READY_TIMEOUT, profile=None):
+    try:
+        return parse_data(render_data_page(url, wait_for, timeout, profile), data_types)
     except Exception as e:
         import traceback
         print("Extraction error:", traceback.format_exc())
         return {"error": str(e)}
 
+async def run_extract_job(job):
+    body = job.params
+    data_types = body.get("data_types", ["emails", "images", "tables"])
+    wait_for = body.get("wait_for")
+    timeout = float(body.get("timeout", READY_TIMEOUT))
+    fetch_mode = body.get("fetch_mode", "auto")
+    parser = body.get("parser", DEFAULT_PARSER)
+    refresh = bool(body.get("refresh", False))
+    trace = Trace(job.kind, body.get("profiler"))
+    # Selenium rendering and parsing run in worker threads to avoid blocking the event loop
+    profile, _ = render_options(body)
+    render = job.in_thread(trace.profiled(functools.partial(
+        render_data_page, wait_for=wait_for, timeout=timeout, profile=profile, trace=trace, cancel=job.cancel_event
+    )))
+    job.update(stage="fetch", progress=0.1)
+    cache_options = {"kind": "data", "wait_for": wait_for, "render": profile.to_dict()}
+    page = await traced_fetch(trace, job.url, render, fetch_mode, cache_options, refresh)
+    job.update(stage="parse", progress=0.5)
+    memo_options = {"parser": parser, "data_types": sorted(data_types)}
+    result, parse_stats = await parse_memoized(page, "data", memo_options, refresh, trace, parse_data, page.html, data_types, parser)
+    parse_stats["parser"] = parser
+    parse_stats["cache"] = page.cache
+    job.emit({"result": result})
+    job.update(stage="export", progress=0.8)
+    response = {"result": result, "tier": page.tier, "parse_stats": parse_stats}
+    # A failed export still returns the extracted data
+    fmt, compression = body.get("format", "xlsx"), body.get("compression")
+    filename, filepath = export_target("extracted", job, fmt, compression)
+    try:
+        rows = await asyncio.get_event_loop().run_in_executor(
+            None, trace.profiled(functools.partial(export_data, result, filepath, fmt, compression, trace=trace))
+        )
+        response.update(export_links(job, filename, fmt, compression, rows))
+        response["excel_file"] = filename if fmt == "xlsx" else None
+    except Exception as e:
+        print(f"[Export] {fmt} export failed for {job.url}: {e}")
+        response.update({"excel_file": None, "export_url": None, "export_error": str(e)})
+    response["trace"] = trace.finish(f"{job.kind}_{job.id[:8]}")
+    return response
+
+
 @app.post("/extract")
 async def extract(request: Request):
     body = await request.json()
     url = body.get("url")
-    data_types = body.get("data_types", ["emails", "images", "tables"])
-    # Run Selenium in a thread to avoid blocking event loop
-    import concurrent.futures
+    if not url:
+        return {"error": "No URL provided."}
+    error = option_errors(body)
+    if error:
+        return error
+    job = scheduler.submit("extract", url, run_extract_job, params=body, priority=int(body.get("priority", 0)))
+    return job_links(job)
+
+
+# --- Job Endpoints ---
+def job_links(job):
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events",
+    }
+
+
+@app.get("/jobs")
+async def list_jobs():
+    return {"jobs": [job.to_dict(include_result=False) for job in scheduler.list()], "scheduler": scheduler.stats()}
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = scheduler.get(job_id)
+    if job is None:
+        return {"error": "Job not found."}
+    return job.to_dict()
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    job = scheduler.cancel(job_id)
+    if job is None:
+        return {"error": "Job not found."}
+    return job.to_dict(include_result=False)
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    job = scheduler.get(job_id)
+    if job is None:
+        return {"error": "Job not found."}
+    return StreamingResponse(sse_stream(job), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/jobs/{job_id}/download")
+async def download_export(job_id: str):
+    # Streams the job's export file in chunks, as an attachment
+    job = scheduler.get(job_id)
+    if job is None:
+        return {"error": "Job not found."}
+    filename = (job.result or {}).get("export_file")
+    if not filename:
+        return {"error": "Export not available.", "status": job.status}
+    path = os.path.join(static_dir_path, filename)
+    if not os.path.exists(path):
+        return {"error": "Export file no longer exists."}
+    return StreamingResponse(
+        iter_file(path),
+        media_type=media_type(job.result["format"], job.result.get("compression")),
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Content-Length": str(os.path.getsize(path))},
+    )
+
+# --- Retention ---
+RETENTION_INTERVAL = float(os.getenv("EXPORT_RETENTION_INTERVAL", "3600"))
+
+
+async def retention_loop():
+    # Old exports (from static/) and profiler reports (from PROFILE_DIR) are swept at startup and then every RETENTION_INTERVAL seconds
     loop = asyncio.get_event_loop()
-    with concurrent.futures.ThreadPoolExecutor() as pool:
-        result = await loop.run_in_executor(pool, extract_data, url, data_types)
-    if isinstance(result, dict) and "error" in result:
-        return {"error": result["error"]}
-    # Save to Excel file
-    try:
-        import pandas as pd
-        from datetime import datetime
-        filename = f"extracted_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        with pd.ExcelWriter(filename) as writer:
-            for key, value in result.items():
-                if isinstance(value, list) and value and isinstance(value[0], list):
-                    pd.DataFrame(value).to_excel(writer, sheet_name=key, index=False)
-                else:
-                    pd.DataFrame(value).to_excel(writer, sheet_name=key, index=False)
-    except Exception as e:
-        print(f"Excel save error: {e}")
-    return {"result": result, "excel_file": filename}
+    locations = [(static_dir_path, EXPORT_PREFIXES, EXPORT_SUFFIXES), (PROFILE_DIR, ("",), PROFILE_SUFFIXES)]
+    while True:
+        try:
+            await loop.run_in_executor(None, cleanup_artifacts, locations)
+        except Exception as e:
+            print(f"[Retention] Cleanup failed: {e}")
+        await asyncio.sleep(RETENTION_INTERVAL)
+
+# --- Metrics ---
+registry.gauge("scraper_jobs", "Jobs currently known to the scheduler, by status.",
+               lambda: {(("status", status),): n for status, n in scheduler.stats()["by_status"].items()})
+registry.gauge("scraper_jobs_waiting", "Jobs waiting for a worker or for their domain's slot.",
+               lambda: scheduler.stats()["queued"] + scheduler.stats()["deferred"])
+registry.gauge("scraper_browser_pool", "Browser pool drivers, by state.",
+               lambda: {(("state", k),): browser_pool.stats()[k] for k in ("size", "live", "idle")})
+
+
+@app.get("/metrics")
+async def metrics():
+    from fastapi.responses import PlainTextResponse
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+# --- Page Cache ---
+@app.get("/cache/stats")
+async def cache_stats():
+    loop = asyncio.get_event_loop()
+    stats = await loop.run_in_executor(None, page_cache.stats)
+    stats["profile_store"] = await loop.run_in_executor(None, profile_store.stats)
+    return stats
 
 # --- Utility Functions ---
 def save_json(data, filename):
     with open(filename, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2, ensure_ascii=False)
 
-def save_csv(data, filename):
-    if isinstance(data, dict):
-        for key, value in data.items():
-            pd.DataFrame(value).to_csv(f"{filename}_{key}.csv", index=False)
-    else:
-        pd.DataFrame(data).to_csv(filename, index=False)
+def save_csv(data, filename, compression=None):
+    save_export(data, filename, "csv", compression)
+
+def save_excel(data, filename, fuzzy=False):
+    save_export(data, filename, "xlsx", fuzzy=fuzzy)
 
-def save_excel(data, filename):
-    # If data is a list of dicts, ensure all possible keys are columns
+def save_export(data, filename, fmt, compression=None, fuzzy=False):
+    # Profile lists are normalized onto the standard columns; extraction results are written by section
     if isinstance(data, list) and data and isinstance(data[0], dict):
-        # Standardize columns
-        standard_cols = ['name', 'designation', 'organization', 'email', 'phone']
-        def map_key(key):
-            k = key.lower()
-            if k in ['name', 'doctor_name', 'faculty_name', 'professor_name', 'main_text']:
-                return 'name'
-            elif k in ['designation', 'title', 'position', 'role']:
-                return 'designation'
-            elif k in ['hospital', 'institute', 'department', 'division', 'unit', 'section', 'organization', 'org']:
-                return 'organization'
-            elif k in ['email', 'e-mail', 'mail']:
-                return 'email'
-            elif k in ['phone', 'mobile', 'contact']:
-                return 'phone'
-            return None
-        clean_profiles = []
-        seen = set()
-        for row in data:
-            new_row = {col: '' for col in standard_cols}
-            # Fill standard columns from mapped keys
-            for k, v in row.items():
-                col = map_key(k)
-                if col and not new_row[col]:
-                    new_row[col] = v
-            # If any standard column is still empty, try to fill from generic columns
-            for k, v in row.items():
-                if not map_key(k):
-                    # Heuristic: try to fill missing name/designation/organization from generic columns if possible
-                    if not new_row['name'] and re.search(r'(professor|lecturer|teacher|dr\.|md\.|mrs\.|mr\.|ashraf|sumit|aziz|kabir|islam|rana|banoo|chowdhury|sultana|sharmin|shahriar|mannan|hussain|saha|chakroborty|farhana|karmaker|sikder|moonmoon|rubina)', str(v), re.I):
-                        new_row['name'] = v
-                    elif not new_row['designation'] and re.search(r'(professor|lecturer|assistant|chairperson|retired|emeritus|supernumerary|study leave|teacher)', str(v), re.I):
-                        new_row['designation'] = v
-                    elif not new_row['organization'] and re.search(r'(department|institute|faculty|school|center|bureau|unit|section|division)', str(v), re.I):
-                        new_row['organization'] = v
-            uniq = (new_row.get('name', '').strip().lower(), new_row.get('organization', '').strip().lower())
-            if uniq in seen or not new_row.get('name'):
-                continue
-            seen.add(uniq)
-            clean_profiles.append(new_row)
-        df = pd.DataFrame(clean_profiles, columns=standard_cols)
-        df.to_excel(filename, index=False)
+        export_profiles(data, filename, fmt, compression, fuzzy)
     elif isinstance(data, dict):
-        with pd.ExcelWriter(filename) as writer:
-            for key, value in data.items():
-                pd.DataFrame(value).to_excel(writer, sheet_name=key, index=False)
-    else:
+        export_data(data, filename, fmt, compression)
+    elif fmt == "xlsx":
         pd.DataFrame(data).to_excel(filename, index=False)
+    else:
+        pd.DataFrame(data).to_csv(filename, index=False)
@@ -0,0 +1,156 @@
+# --- Imports ---
+import httpx
+import asyncio
+import os
+import re
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx when installed)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# --- Fetcher Settings (override through environment) ---
+STATIC_TIMEOUT = float(os.getenv("STATIC_FETCH_TIMEOUT", "15"))
+MAX_CONNECTIONS = int(os.getenv("STATIC_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE = int(os.getenv("STATIC_MAX_KEEPALIVE", "20"))
+USER_AGENT = os.getenv(
+    "STATIC_USER_AGENT",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+)
+FETCH_MODES = ("auto", "static", "browser")
+
+# --- Completeness Heuristic ---
+_TAG_RE = {
+    "links": re.compile(r"<a\s[^>]*href=", re.I),
+    "tables": re.compile(r"<table[\s>]", re.I),
+    "rows": re.compile(r"<tr[\s>]", re.I),
+    # List items with text of their own (possibly inside inline tags), not empty bullets
+    "items": re.compile(r"<li[^>]*>\s*(?:<(?!/li)[^>]+>\s*)*[^<\s]", re.I),
+    "cards": re.compile(r"class=[\"'][^\"']*(?:card|profile|member|faculty|doctor|staff|person|team)[^\"']*[\"']", re.I),
+}
+# Site chrome: a navbar or footer alone has enough links and items to look like a listing
+_CHROME_RE = re.compile(r"<(nav|header|footer)\b[^>]*>.*?</\1\s*>", re.I | re.S)
+# Empty mount points left by React/Vue/Angular/Next apps before hydration
+_SPA_SHELL_RE = re.compile(
+    r"<(?:div|main)[^>]*\bid=[\"'](?:root|app|__next|__nuxt|main-app)[\"'][^>]*>\s*</(?:div|main)>|<app-root[^>]*>\s*</app-root>",
+    re.I,
+)
+_NOSCRIPT_RE = re.compile(r"<noscript[^>]*>[^<]*(?:enable|requires?)\s+javascript", re.I)
+# Content the browser has to fetch or reveal: containers filled from an endpoint, load-more
+# buttons and infinite scroll
+_DEFERRED_RE = re.compile(
+    r"<(?:div|section|ul|ol|tbody|table)\b[^>]*\bdata-(?:src|endpoint|url|api|source|load)\s*="
+    r"|\b(?:load|show)[\s_-]*more\b"
+    r"|infinite[\s_-]*scroll|data-infinite|data-next-page",
+    re.I,
+)
+_STRIP_RE = re.compile(r"<script\b.*?</script>|<style\b.*?</style>|<[^>]+>", re.I | re.S)
+MIN_TEXT_CHARS = 400
+
+
+def page_signals(html):
+    # Counts come from the page without its <nav>, <header> and <footer>
+    content = _CHROME_RE.sub(" ", html)
+    signals = {name: len(pattern.findall(content)) for name, pattern in _TAG_RE.items()}
+    signals["text_chars"] = len(" ".join(_STRIP_RE.sub(" ", content).split()))
+    signals["spa_shell"] = bool(_SPA_SHELL_RE.search(html)) or bool(_NOSCRIPT_RE.search(html))
+    signals["deferred"] = bool(_DEFERRED_RE.search(html))
+    return signals
+
+
+def looks_complete(html):
+    """
+    Decides whether server-rendered HTML already holds the content we scrape,
+    so the browser can be skipped. SPA shells, near-empty pages, pages whose content
+    is loaded later (placeholder containers, load-more, infinite scroll) and pages
+    whose only repeated structure is the site's nav/header/footer fail.
+    """
+    if not html:
+        return False
+    signals = page_signals(html)
+    if signals["spa_shell"] or signals["deferred"] or signals["text_chars"] < MIN_TEXT_CHARS:
+        return False
+    # Repeated content structure: table rows, cards or list items with text
+    return signals["rows"] >= 5 or signals["cards"] >= 3 or signals["items"] >= 10
+
+
+def static_result(response):
+    # FetchResult for an httpx response, or None when it is an error or not a page
+    content_type = response.headers.get("content-type", "")
+    if response.status_code >= 400 or ("html" not in content_type and "xml" not in content_type):
+        return None
+    return FetchResult(str(response.url), response.text, "static", response.status_code, dict(response.headers))
+
+
+class FetchResult:
+    def __init__(self, url, html, tier, status=None, headers=None):
+        self.url = url
+        self.html = html
+        self.tier = tier
+        self.status = status
+        self.headers = headers or {}
+        # Set by the page cache: "hit", "revalidated", "miss" or "refresh", and the sha256 of html
+        self.cache = None
+        self.content_hash = None
+
+
+class TieredFetcher:
+    """
+    Tries a plain pooled HTTP fetch first and only falls back to the headless
+    browser when the static HTML looks incomplete (or the request forces it).
+    """
+
+    def __init__(self):
+        self._client = None
+
+    async def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                follow_redirects=True,
+                timeout=STATIC_TIMEOUT,
+                limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE),
+                headers={"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8"},
+            )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self):
+        return self._client
+
+    async def fetch_static(self, url, headers=None):
+        await self.start()
+        try:
+            response = await self._client.get(url, headers=headers)
+        except httpx.HTTPError as e:
+            print(f"[Fetcher] Static fetch failed for {url}: {e}")
+            return None
+        return static_result(response)
+
+    async def fetch(self, url, render, mode="auto", static=None):
+        """
+        `render` is a blocking callable `render(url) -> html` that drives the browser;
+        it runs in a worker thread. `mode` is one of "auto", "static" or "browser".
+        `static` is a static FetchResult the caller already has (a cache revalidation's 200),
+        used instead of requesting the URL again.
+        """
+        if mode not in FETCH_MODES:
+            raise ValueError(f"fetch_mode must be one of {FETCH_MODES}")
+        if mode != "browser":
+            static = static or await self.fetch_static(url)
+            if static is not None and (mode == "static" or looks_complete(static.html)):
+                return static
+            if mode == "static":
+                raise RuntimeError(f"Static fetch failed for {url}")
+        loop = asyncio.get_event_loop()
+        html = await loop.run_in_executor(None, render, url)
+        headers = static.headers if static is not None else {}
+        return FetchResult(url, html, "browser", headers=headers)
+
+
+fetcher = TieredFetcher()
@@ -0,0 +1,327 @@
+# --- Imports ---
+from cache import CACHE_DIR, options_key, content_hash
+from dom_text import Scope, whole_scope
+from metrics import NULL_TRACE
+from normalize import normalize_profiles, STANDARD_COLS
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+# --- Incremental Settings (override through environment) ---
+STORE_PATH = os.getenv("PROFILE_STORE_PATH", os.path.join(CACHE_DIR, "profiles.sqlite3"))
+STORE_MAX_SECTIONS = int(os.getenv("PROFILE_STORE_MAX_SECTIONS", "50000"))
+# A section closes after at least SECTION_MIN blocks when a block's hash hits 1 in SECTION_AVG,
+# and always at SECTION_MAX; pages with fewer than 2 * SECTION_MIN blocks are one section
+SECTION_MIN = int(os.getenv("SECTION_MIN_BLOCKS", "8"))
+SECTION_AVG = int(os.getenv("SECTION_AVG_BLOCKS", "16"))
+SECTION_MAX = int(os.getenv("SECTION_MAX_BLOCKS", "64"))
+# The content root is the deepest element holding at least this share of the page's words
+CONTENT_SHARE = float(os.getenv("SECTION_CONTENT_SHARE", "0.5"))
+
+CHANGES = ("added", "changed", "removed")
+
+
+def _digest(*parts):
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def identity(record):
+    # The (name, organization) key normalize_profiles dedups on
+    return json.dumps([str(record.get('name', '')).strip().lower(), str(record.get('organization', '')).strip().lower()], ensure_ascii=False)
+
+
+# --- Page Sections ---
+def content_root(index):
+    # Walks down from <body> while a single child still holds most of the text
+    node = index.find('body')
+    node = index.root if node is None else node
+    total = index.word_count(node)
+    while total:
+        heavy = [child for child in index.children(node) if index.word_count(child) >= CONTENT_SHARE * total]
+        if not heavy:
+            return node
+        node = heavy[0]
+    return node
+
+
+def _ancestors(index, node):
+    # node and its ancestors below the document, innermost first
+    chain = []
+    while node is not None and node is not index.root:
+        chain.append(node)
+        node = index.parent(node)
+    return chain
+
+
+def _context(index, root):
+    """
+    What the passes read above a section: the root's ancestor tags and, for every enclosing
+    table, its header rows (the table pass takes column names from them and skips the first row).
+    """
+    parts = []
+    for node in _ancestors(index, root):
+        parts.append(index.name(node))
+        if index.name(node) == 'table':
+            for header in (index.find('thead', root=node), index.find('tr', root=node)):
+                parts.append(index.signature(header) if header is not None else '')
+    return _digest(*parts)
+
+
+def _chunks(blocks):
+    # Content-defined boundaries: an inserted or edited block only disturbs the section it lands in
+    chunks = []
+    chunk = []
+    for block, fingerprint in blocks:
+        chunk.append((block, fingerprint))
+        if len(chunk) >= SECTION_MAX or (len(chunk) >= SECTION_MIN and int(fingerprint[:8], 16) % SECTION_AVG == 0):
+            chunks.append(chunk)
+            chunk = []
+    if chunk:
+        # A short tail joins the section before it rather than standing alone
+        if len(chunk) < SECTION_MIN and chunks:
+            chunks[-1].extend(chunk)
+        else:
+            chunks.append(chunk)
+    return chunks
+
+
+def page_sections(index):
+    """
+    Splits the content root's children into runs for incremental extraction.
+    Returns (root, [(fingerprint, blocks)]), or (root, []) for pages too small to split.
+    A fingerprint covers the blocks' tags, nesting, text and link targets plus the context above them.
+    """
+    root = content_root(index)
+    blocks = index.children(root)
+    if len(blocks) < 2 * SECTION_MIN:
+        return root, []
+    context = _context(index, root)
+    return root, [
+        (_digest(context, *(fingerprint for _, fingerprint in chunk)), [block for block, _ in chunk])
+        for chunk in _chunks((block, _digest(index.signature(block))) for block in blocks)
+    ]
+
+
+class SectionedPasses:
+    """
+    run_pass for profiles_from_index in incremental mode. Each section runs a pass once and
+    stores what it found, keyed relative to the section so the results fit wherever the section
+    sits on the next run. The rest of the page (header, footer, the content root's ancestors)
+    runs fresh every time, and the merged results go through the same page-wide thresholds.
+    """
+
+    def __init__(self, index, matcher, passes, root, sections, known):
+        self.index = index
+        self.matcher = matcher
+        self.passes = passes
+        self.sections = sections
+        self.known = known
+        self.fresh = {}
+        self.spine = _ancestors(index, root)
+        self.spine_positions = {index.position(node): k for k, node in enumerate(self.spine)}
+        blocks = [block for _, section in sections for block in section]
+        self.remainder = Scope(index, blocks, outside=True, spine=self.spine)
+
+    def _stored(self, fingerprint):
+        stored = self.fresh.get(fingerprint) or self.known.get(fingerprint)
+        return stored if isinstance(stored, dict) else {}
+
+    def _relative(self, key, base, end):
+        # Positions inside the section count from its first block; enclosing nodes by their depth above it
+        return [key[0]] + [p - base if base <= p < end else -1 - self.spine_positions[p] for p in key[1:]]
+
+    def _absolute(self, key, base):
+        return (key[0],) + tuple(base + p if p >= 0 else self.index.position(self.spine[-1 - p]) for p in key[1:])
+
+    def __call__(self, name):
+        index, run = self.index, self.passes[name]
+        found = []
+        leaves = 0
+        for fingerprint, blocks in self.sections:
+            stored = self._stored(fingerprint)
+            base, end = index.position(blocks[0]), index.subtree(blocks[-1])[1]
+            if name not in stored:
+                items, kept, _ = run(index, self.matcher, Scope(index, blocks))
+                stored = self.fresh[fingerprint] = dict(stored, **{name: {
+                    "found": [[self._relative(key, base, end), profile] for key, profile in items],
+                    "kept": len(kept),
+                }})
+            found.extend((self._absolute(key, base), profile) for key, profile in stored[name]["found"])
+            leaves += stored[name]["kept"]
+        items, kept, spine = run(index, self.matcher, self.remainder)
+        if spine:
+            # An ancestor of the content root is a card only when a single card chain lies below it
+            innermost = spine[-1]
+            if leaves + sum(1 for node in kept if index.contains(innermost, node)) < 2:
+                return run(index, self.matcher, whole_scope(index))[0]
+        found.extend(items)
+        found.sort(key=lambda item: item[0])
+        return found
+
+
+# --- Profile Store ---
+class ProfileStore:
+    """
+    SQLite store behind incremental re-scrapes.
+      sections - what each profile pass found in a page section (or a whole small page),
+                 keyed by fingerprint and extraction options, so unchanged sections skip the heuristics
+      profiles - the last normalized record of every person per source (the crawl's start URL),
+                 keyed on identity(); diffing a new run against it yields the delta
+    """
+
+    def __init__(self, path=STORE_PATH, max_sections=STORE_MAX_SECTIONS):
+        self.path = path
+        self.max_sections = max_sections
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _conn(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS sections (
+                    fingerprint TEXT, options TEXT, profiles BLOB, accessed_at REAL,
+                    PRIMARY KEY (fingerprint, options)
+                );
+                CREATE TABLE IF NOT EXISTS profiles (
+                    source TEXT, identity TEXT, record TEXT, digest TEXT, first_seen REAL, updated_at REAL,
+                    PRIMARY KEY (source, identity)
+                );
+                CREATE INDEX IF NOT EXISTS sections_accessed ON sections (accessed_at);
+            """)
+        return self._db
+
+    # --- Sections ---
+    def get_sections(self, fingerprints, options=None):
+        if not fingerprints:
+            return {}
+        key = options_key(options)
+        found = {}
+        with self._lock:
+            db = self._conn()
+            for i in range(0, len(fingerprints), 500):
+                batch = fingerprints[i:i + 500]
+                rows = db.execute(
+                    f"SELECT fingerprint, profiles FROM sections WHERE options = ? AND fingerprint IN ({','.join('?' * len(batch))})",
+                    [key, *batch],
+                ).fetchall()
+                for fingerprint, data in rows:
+                    found[fingerprint] = json.loads(zlib.decompress(data).decode("utf-8"))
+            if found:
+                now = time.time()
+                db.executemany("UPDATE sections SET accessed_at = ? WHERE fingerprint = ? AND options = ?", [(now, f, key) for f in found])
+                db.commit()
+        return found
+
+    def put_sections(self, sections, options=None):
+        if not sections:
+            return
+        key, now = options_key(options), time.time()
+        rows = [
+            (fingerprint, key, zlib.compress(json.dumps(profiles, default=str).encode("utf-8"), 6), now)
+            for fingerprint, profiles in sections.items()
+        ]
+        with self._lock:
+            db = self._conn()
+            db.executemany("INSERT OR REPLACE INTO sections VALUES (?, ?, ?, ?)", rows)
+            db.execute(
+                "DELETE FROM sections WHERE rowid NOT IN (SELECT rowid FROM sections ORDER BY accessed_at DESC LIMIT ?)",
+                (self.max_sections,),
+            )
+            db.commit()
+
+    # --- Records ---
+    def diff(self, source, records, apply_removals=True):
+        """
+        Compares this run's normalized records with the stored ones for `source` and saves the new state.
+        Returns {"added": [...], "changed": [...], "removed": [...], "unchanged": n}. With
+        apply_removals=False (an incomplete crawl) missing records are kept and not reported.
+        """
+        current = {}
+        for record in records:
+            current[identity(record)] = (record, _digest(json.dumps(record, sort_keys=True, default=str)))
+        with self._lock:
+            db = self._conn()
+            stored = dict(db.execute("SELECT identity, digest FROM profiles WHERE source = ?", (source,)))
+            delta = {change: [] for change in CHANGES}
+            for key, (record, digest) in current.items():
+                if key not in stored:
+                    delta["added"].append(record)
+                elif stored[key] != digest:
+                    delta["changed"].append(record)
+            removed = [key for key in stored if key not in current] if apply_removals else []
+            for i in range(0, len(removed), 500):
+                batch = removed[i:i + 500]
+                placeholders = ','.join('?' * len(batch))
+                delta["removed"].extend(
+                    json.loads(row[0]) for row in
+                    db.execute(f"SELECT record FROM profiles WHERE source = ? AND identity IN ({placeholders})", [source, *batch])
+                )
+                db.execute(f"DELETE FROM profiles WHERE source = ? AND identity IN ({placeholders})", [source, *batch])
+            now = time.time()
+            db.executemany(
+                "INSERT INTO profiles VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (source, identity) DO UPDATE SET "
+                "record = excluded.record, digest = excluded.digest, updated_at = excluded.updated_at",
+                [
+                    (source, identity(record), json.dumps(record, ensure_ascii=False, default=str), current[identity(record)][1], now, now)
+                    for record in delta["added"] + delta["changed"]
+                ],
+            )
+            db.commit()
+        delta["unchanged"] = len(current) - len(delta["added"]) - len(delta["changed"])
+        return delta
+
+    def forget(self, source):
+        # Drops the stored records of a source, so its next run reports everything as added
+        with self._lock:
+            self._conn().execute("DELETE FROM profiles WHERE source = ?", (source,))
+            self._conn().commit()
+
+    def stats(self):
+        with self._lock:
+            sections = self._conn().execute("SELECT COUNT(*) FROM sections").fetchone()[0]
+            sources, records = self._conn().execute("SELECT COUNT(DISTINCT source), COUNT(*) FROM profiles").fetchone()
+        return {"sections": sections, "sources": sources, "records": records}
+
+
+def sectioned_profiles(index, html, url, extract, passes, matcher, store, options=None, reuse=True):
+    """
+    extract(index, url, run_pass) is profiles_from_index; its passes run only on sections the
+    store has not seen, known sections return their stored results. Pages too small to split
+    are stored whole under their content hash. Returns (profiles, stats).
+    """
+    root, sections = page_sections(index)
+    if not sections:
+        fingerprint = content_hash(html)
+        stored = store.get_sections([fingerprint], options).get(fingerprint) if reuse else None
+        if isinstance(stored, dict) and "page" in stored:
+            return stored["page"], {"sections": 1, "sections_reused": 1}
+        profiles = extract(index, url)
+        store.put_sections({fingerprint: {"page": profiles}}, options)
+        return profiles, {"sections": 1, "sections_reused": 0}
+    known = store.get_sections([fingerprint for fingerprint, _ in sections], options) if reuse else {}
+    run_pass = SectionedPasses(index, matcher, passes, root, sections, known)
+    profiles = extract(index, url, run_pass)
+    store.put_sections(run_pass.fresh, options)
+    return profiles, {"sections": len(sections), "sections_reused": len({f for f, _ in sections} - set(run_pass.fresh))}
+
+
+def profile_delta(store, source, profiles, fuzzy=False, apply_removals=True, trace=None):
+    # Normalizes the full run (identities need every record), then diffs it against the store
+    trace = trace or NULL_TRACE
+    with trace.span("normalize", profiles=len(profiles), fuzzy=fuzzy) as span:
+        frame = normalize_profiles(profiles, fuzzy=fuzzy)
+        span.set(rows=len(frame))
+    with trace.span("diff", source=source) as span:
+        records = [dict(zip(STANDARD_COLS, row)) for row in frame[STANDARD_COLS].itertuples(index=False, name=None)]
+        delta = store.diff(source, records, apply_removals)
+        span.set(**{change: len(delta[change]) for change in CHANGES}, unchanged=delta["unchanged"])
+    return delta
+
+
+profile_store = ProfileStore()
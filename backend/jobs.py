@@ -0,0 +1,325 @@
+# --- Imports ---
+from collections import defaultdict, deque
+from metrics import registry
+from urllib.parse import urlparse
+import asyncio
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+
+# --- Scheduler Settings (override through environment) ---
+MAX_CONCURRENCY = int(os.getenv("JOBS_MAX_CONCURRENCY", "4"))
+PER_DOMAIN_CONCURRENCY = int(os.getenv("JOBS_PER_DOMAIN_CONCURRENCY", "2"))
+RETAIN_FINISHED = int(os.getenv("JOBS_RETAIN_FINISHED", "500"))
+# Partial results kept for late SSE subscribers while a job runs; dropped when it finishes
+KEEP_PARTIALS = int(os.getenv("JOBS_KEEP_PARTIALS", "50"))
+THREAD_POLL_INTERVAL = 0.05
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+jobs_total = registry.counter("scraper_jobs_total", "Finished jobs, by kind and final status.")
+job_queue_seconds = registry.histogram("scraper_job_queue_seconds", "Time jobs waited before a worker picked them up.")
+job_run_seconds = registry.histogram("scraper_job_run_seconds", "Time jobs spent running, by kind and final status.")
+
+
+class JobError(Exception):
+    # Raised by a job runner for an expected failure (nothing found, bad input); shown to the client as-is
+    pass
+
+
+class Job:
+    def __init__(self, kind, url, params, priority=0):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.url = url
+        self.domain = (urlparse(url).hostname or "").lower()
+        self.params = params
+        self.priority = priority
+        self.status = QUEUED
+        self.stage = None
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.partials = deque(maxlen=max(0, KEEP_PARTIALS))
+        self.partial_count = 0
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # Set on cancel; renders poll it in their readiness/scroll/click loops (see in_thread)
+        self.cancel_event = threading.Event()
+        self._threads = 0
+        self._threads_lock = threading.Lock()
+        self._runner = None
+        self._task = None
+        self._subscribers = []
+        self._loop = None
+
+    # --- Progress reporting (safe to call from worker threads) ---
+    def update(self, stage=None, progress=None):
+        if stage is not None:
+            self.stage = stage
+        if progress is not None:
+            self.progress = max(self.progress, min(1.0, float(progress)))
+        self._publish("progress", {"stage": self.stage, "progress": self.progress})
+
+    def emit(self, partial):
+        self.partial_count += 1
+        self.partials.append(partial)
+        self._publish("partial", partial)
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    # --- Worker threads ---
+    def in_thread(self, fn):
+        """
+        Wraps blocking work the runner hands to an executor. Cancelling the job cancels its
+        task but not the thread, so the scheduler waits for wrapped calls before freeing the domain slot.
+        """
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            with self._threads_lock:
+                self._threads += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._threads_lock:
+                    self._threads -= 1
+        return run
+
+    @property
+    def threads(self):
+        return self._threads
+
+    def _publish(self, event, data):
+        if not self._subscribers:
+            return
+        message = (event, data)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        for queue in list(self._subscribers):
+            if running is self._loop:
+                queue.put_nowait(message)
+            elif self._loop is not None:
+                self._loop.call_soon_threadsafe(queue.put_nowait, message)
+
+    def subscribe(self):
+        queue = asyncio.Queue()
+        self._loop = asyncio.get_running_loop()
+        self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+    def timings(self):
+        now = time.time()
+        started = self.started_at or (now if self.status == QUEUED else None)
+        return {
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "queued_s": round((started or now) - self.created_at, 3),
+            "run_s": round((self.finished_at or now) - self.started_at, 3) if self.started_at else None,
+        }
+
+    def to_dict(self, include_result=True):
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "url": self.url,
+            "priority": self.priority,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": round(self.progress, 3),
+            "error": self.error,
+            "timings": self.timings(),
+            "partials": self.partial_count,
+        }
+        if include_result:
+            data["result"] = self.result
+        return data
+
+
+class JobScheduler:
+    """
+    Runs jobs from a priority queue (higher priority first, FIFO within a priority)
+    with a global concurrency cap and a per-domain cap. A job whose domain is at its
+    cap waits on the side without holding a worker, and is re-queued when a slot frees.
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, per_domain=PER_DOMAIN_CONCURRENCY):
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_domain = max(1, per_domain)
+        self._jobs = {}
+        self._queue = None
+        self._seq = itertools.count()
+        self._active_domains = defaultdict(int)
+        self._deferred = defaultdict(deque)
+        self._workers = []
+
+    def start(self):
+        if self._workers:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._workers = [asyncio.ensure_future(self._worker()) for _ in range(self.max_concurrency)]
+
+    async def stop(self):
+        for job in list(self._jobs.values()):
+            if job.status not in FINISHED:
+                self.cancel(job.id)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, kind, url, runner, params=None, priority=0):
+        """`runner` is an async callable `runner(job)` whose return value becomes job.result."""
+        if self._queue is None:
+            self.start()
+        job = Job(kind, url, params or {}, priority)
+        job._runner = runner
+        self._jobs[job.id] = job
+        self._enqueue(job)
+        self._prune()
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def list(self):
+        return sorted(self._jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    def cancel(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is None or job.status in FINISHED:
+            return job
+        job.cancel_event.set()
+        if job._task is not None:
+            job._task.cancel()
+        else:
+            self._finish(job, CANCELLED)
+        return job
+
+    def stats(self):
+        counts = defaultdict(int)
+        for job in self._jobs.values():
+            counts[job.status] += 1
+        return {
+            "max_concurrency": self.max_concurrency,
+            "per_domain": self.per_domain,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "deferred": sum(len(q) for q in self._deferred.values()),
+            "by_status": dict(counts),
+        }
+
+    def _enqueue(self, job):
+        self._queue.put_nowait((-job.priority, next(self._seq), job))
+
+    async def _worker(self):
+        while True:
+            _, _, job = await self._queue.get()
+            if job.status != QUEUED:
+                continue
+            if self._active_domains[job.domain] >= self.per_domain:
+                self._deferred[job.domain].append(job)
+                continue
+            self._active_domains[job.domain] += 1
+            try:
+                await self._run(job)
+                # A cancelled or failed job can leave a render running in a worker thread
+                while job.threads:
+                    await asyncio.sleep(THREAD_POLL_INTERVAL)
+            finally:
+                self._active_domains[job.domain] -= 1
+                self._release_deferred(job.domain)
+
+    def _release_deferred(self, domain):
+        waiting = self._deferred.get(domain)
+        while waiting:
+            job = waiting.popleft()
+            if job.status == QUEUED:
+                self._enqueue(job)
+                break
+        if not waiting:
+            self._deferred.pop(domain, None)
+
+    async def _run(self, job):
+        job.status = RUNNING
+        job.started_at = time.time()
+        job_queue_seconds.observe(job.started_at - job.created_at, kind=job.kind)
+        job.update(stage="started", progress=0.0)
+        job._task = asyncio.ensure_future(job._runner(job))
+        try:
+            job.result = await job._task
+        except asyncio.CancelledError:
+            job.cancel_event.set()
+            self._finish(job, CANCELLED)
+            return
+        except JobError as e:
+            job.error = str(e)
+            self._finish(job, FAILED)
+            return
+        except Exception as e:
+            import traceback
+            print(f"[Jobs] {job.kind} job {job.id} failed:", traceback.format_exc())
+            job.error = str(e)
+            self._finish(job, FAILED)
+            return
+        job.progress = 1.0
+        self._finish(job, DONE)
+
+    def _finish(self, job, status):
+        job.status = status
+        job.finished_at = time.time()
+        job._task = None
+        # The result (or error) replaces the partials; retained jobs keep only the count
+        job.partials.clear()
+        jobs_total.inc(kind=job.kind, status=status)
+        if job.started_at:
+            job_run_seconds.observe(job.finished_at - job.started_at, kind=job.kind, status=status)
+        job._publish("status", job.to_dict(include_result=status == DONE))
+
+    def _prune(self):
+        finished = [job for job in self._jobs.values() if job.status in FINISHED]
+        if len(finished) <= RETAIN_FINISHED:
+            return
+        finished.sort(key=lambda job: job.finished_at or 0)
+        for job in finished[:len(finished) - RETAIN_FINISHED]:
+            self._jobs.pop(job.id, None)
+
+
+async def sse_stream(job):
+    # Server-sent events: a snapshot first, then progress/partial/status events until the job ends.
+    # A late subscriber gets only the last KEEP_PARTIALS partials, none once the job has finished.
+    queue = job.subscribe()
+    try:
+        yield f"event: snapshot\ndata: {json.dumps(job.to_dict(include_result=False), default=str)}\n\n"
+        for partial in list(job.partials):
+            yield f"event: partial\ndata: {json.dumps(partial, default=str)}\n\n"
+        if job.status in FINISHED:
+            yield f"event: status\ndata: {json.dumps(job.to_dict(), default=str)}\n\n"
+            return
+        while True:
+            try:
+                event, data = await asyncio.wait_for(queue.get(), timeout=15)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+            if event == "status":
+                return
+    finally:
+        job.unsubscribe(queue)
+
+
+scheduler = JobScheduler()
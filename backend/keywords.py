@@ -0,0 +1,113 @@
+# --- Imports ---
+from urllib.parse import urlparse
+import functools
+import json
+import os
+import re
+
+# --- Default Keyword Lists ---
+PROFILE_KEYWORDS = [
+    'professor', 'lecturer', 'doctor', 'department', 'faculty', 'designation', 'specialty', 'hospital', 'chamber',
+    'contact', 'email', 'phone', 'research', 'publication', 'employee', 'staff', 'teacher', 'medical', 'clinic', 'practice', 'biography', 'cv', 'resume', 'name', 'qualification', 'experience', 'address', 'mobile', 'office', 'division', 'unit', 'section', 'group', 'role', 'title', 'position', 'subject', 'field', 'area', 'expertise', 'interest', 'profile', 'bio', 'about'
+]
+NAVIGATION_KEYWORDS = [
+    'academics', 'academic', 'programs', 'admission', 'libraries', 'bodies', 'institutes', 'constituent', 'affiliated', 'calendar', 'undergraduate', 'graduate', 'mphil', 'phd', 'international students', 'service', 'footer', 'home', 'about', 'news', 'events', 'contact', 'login', 'register', 'search', 'menu', 'sidebar', 'navigation', 'copyright', 'disclaimer', 'privacy', 'terms', 'departments', 'faculty', 'staff', 'employee', 'directory', 'list', 'members', 'committee', 'board', 'administration', 'management', 'office', 'unit', 'division', 'section', 'group', 'organization', 'org', 'orgs', 'people', 'personnel', 'team', 'teams', 'overview', 'info', 'information', 'details', 'resources', 'links', 'site', 'web', 'webpage', 'page', 'pages', 'main', 'general', 'profile', 'profiles', 'bio', 'bios', 'about'
+]
+
+PROFILE = 'profile'
+NAVIGATION = 'navigation'
+
+
+_WORD_RE = re.compile(r'\w+')
+
+
+class KeywordMatcher:
+    """
+    Classifies text against the profile and navigation keywords in one pass.
+    A single-word keyword is word-bounded exactly when it equals a whole word token,
+    so the text is tokenized once and intersected with a keyword set.
+    Multi-word or punctuated keywords go through one precompiled alternation regex.
+    """
+
+    def __init__(self, profile_keywords=PROFILE_KEYWORDS, navigation_keywords=NAVIGATION_KEYWORDS):
+        self.profile_keywords = tuple(dict.fromkeys(kw.lower() for kw in profile_keywords))
+        self.navigation_keywords = tuple(dict.fromkeys(kw.lower() for kw in navigation_keywords))
+        self._kinds = {}
+        for kw in self.profile_keywords:
+            self._kinds.setdefault(kw, set()).add(PROFILE)
+        for kw in self.navigation_keywords:
+            self._kinds.setdefault(kw, set()).add(NAVIGATION)
+        self._words = frozenset(kw for kw in self._kinds if _WORD_RE.fullmatch(kw))
+        phrases = sorted((kw for kw in self._kinds if kw not in self._words), key=len, reverse=True)
+        self._phrase_pattern = re.compile(r'\b(?:' + '|'.join(re.escape(kw) for kw in phrases) + r')\b') if phrases else None
+
+    def matches(self, text):
+        # All keywords present in text (lowercased)
+        if not text:
+            return set()
+        lower = text.lower()
+        found = self._words.intersection(_WORD_RE.findall(lower))
+        if self._phrase_pattern is not None:
+            found = found.union(self._phrase_pattern.findall(lower))
+        return found
+
+    def classify(self, text):
+        # Returns (profile_hits, navigation_hits) as sets of matched keywords
+        profile_hits, navigation_hits = set(), set()
+        for kw in self.matches(text):
+            kinds = self._kinds[kw]
+            if PROFILE in kinds:
+                profile_hits.add(kw)
+            if NAVIGATION in kinds:
+                navigation_hits.add(kw)
+        return profile_hits, navigation_hits
+
+    def has_profile(self, text):
+        return any(PROFILE in self._kinds[kw] for kw in self.matches(text))
+
+    def is_navigation(self, text):
+        return any(NAVIGATION in self._kinds[kw] for kw in self.matches(text))
+
+
+# --- Per-Domain Configuration ---
+# KEYWORDS_CONFIG points at a JSON file like:
+# {"example.edu": {"profile": ["fellow"], "navigation": ["alumni"], "replace": false}}
+# Keywords extend the defaults unless "replace" is true. Subdomains inherit their parent's entry.
+DOMAIN_KEYWORDS = {}
+
+
+def load_domain_config(path=None):
+    path = path or os.getenv("KEYWORDS_CONFIG")
+    if not path or not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        for domain, entry in json.load(f).items():
+            register_domain(domain, entry.get("profile"), entry.get("navigation"), entry.get("replace", False))
+
+
+def register_domain(domain, profile=None, navigation=None, replace=False):
+    DOMAIN_KEYWORDS[domain.lower()] = {"profile": profile or [], "navigation": navigation or [], "replace": replace}
+    _matcher_for_host.cache_clear()
+
+
+@functools.lru_cache(maxsize=256)
+def _matcher_for_host(host):
+    labels = host.split('.')
+    for i in range(len(labels)):
+        entry = DOMAIN_KEYWORDS.get('.'.join(labels[i:]))
+        if entry:
+            if entry["replace"]:
+                return KeywordMatcher(entry["profile"], entry["navigation"])
+            return KeywordMatcher(PROFILE_KEYWORDS + entry["profile"], NAVIGATION_KEYWORDS + entry["navigation"])
+    return default_matcher
+
+
+def matcher_for(url=None):
+    host = urlparse(url).hostname if url else None
+    if not host:
+        return default_matcher
+    return _matcher_for_host(host.lower())
+
+
+default_matcher = KeywordMatcher()
+load_domain_config()
@@ -0,0 +1,327 @@
+# --- Imports ---
+from contextlib import contextmanager
+import io
+import os
+import threading
+import time
+
+# --- Metrics Settings ---
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.path.dirname(__file__), "static", "profiles"))
+# Report files Trace._write_profile leaves in PROFILE_DIR
+PROFILE_SUFFIXES = (".prof", ".txt", ".html")
+MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "200"))
+PROFILERS = ("cprofile", "pyinstrument")
+# Only one cProfile profiler can be active in a process at a time (enforced from Python 3.12 on),
+# so a call that finds it taken runs unprofiled and is counted as skipped
+_CPROFILE_LOCK = threading.Lock()
+
+# Span attributes that are also totalled as counters on /metrics
+COUNTED_ATTRS = ("bytes", "nodes", "profiles", "rows")
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=None):
+    pairs = list(key) + (list(extra.items()) if extra else [])
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.kind = "counter"
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, None, value) for key, value in sorted(self._values.items())]
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.kind = "histogram"
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        out = []
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts):
+                    cumulative += n
+                    out.append((f"{self.name}_bucket", key, {"le": _format_value(bound)}, cumulative))
+                out.append((f"{self.name}_sum", key, None, total))
+                out.append((f"{self.name}_count", key, None, count))
+        return out
+
+
+class Gauge:
+    # Read at scrape time from `fn`, which returns {label dict as tuple(sorted items): value} or a number
+    def __init__(self, name, help_text, fn):
+        self.name = name
+        self.help = help_text
+        self.kind = "gauge"
+        self.fn = fn
+
+    def samples(self):
+        try:
+            values = self.fn()
+        except Exception:
+            return []
+        if not isinstance(values, dict):
+            return [(self.name, (), None, values)]
+        return [(self.name, key, None, value) for key, value in sorted(values.items())]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help_text):
+        return self._add(Counter(name, help_text))
+
+    def histogram(self, name, help_text, buckets=DURATION_BUCKETS):
+        return self._add(Histogram(name, help_text, buckets))
+
+    def gauge(self, name, help_text, fn):
+        return self._add(Gauge(name, help_text, fn))
+
+    def render(self):
+        # Prometheus text exposition format, version 0.0.4
+        out = io.StringIO()
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            out.write(f"# HELP {metric.name} {metric.help}\n")
+            out.write(f"# TYPE {metric.name} {metric.kind}\n")
+            for name, key, extra, value in metric.samples():
+                out.write(f"{name}{_format_labels(key, extra)} {_format_value(value)}\n")
+        return out.getvalue()
+
+
+registry = Registry()
+stage_seconds = registry.histogram("scraper_stage_duration_seconds", "Time spent in each job stage.")
+stage_totals = {
+    attr: registry.counter(f"scraper_stage_{attr}_total", f"Total {attr} handled by each job stage.")
+    for attr in COUNTED_ATTRS
+}
+
+
+class Span:
+    def __init__(self, name, offset, attrs):
+        self.name = name
+        self.offset = offset
+        self.started = time.perf_counter()
+        self.duration = None
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "start_ms": round(self.offset * 1000, 2),
+            "duration_ms": round((self.duration or 0) * 1000, 2),
+            **self.attrs,
+        }
+
+
+class Trace:
+    """
+    Per-job record of stage spans (fetch, render, parse, classify, normalize, export).
+    Spans may be opened from the event loop or from worker threads. Each finished span
+    also feeds the /metrics histograms, so failed jobs still show up there.
+    With a profiler ("cprofile" or "pyinstrument"), functions wrapped by `profiled` run
+    under it in their worker thread and the combined report is written at `finish`.
+    cProfile runs one call at a time process-wide; calls made while another is profiled
+    are not in the report and show up as "skipped".
+    """
+
+    def __init__(self, kind, profiler=None):
+        if profiler is not None and profiler not in PROFILERS:
+            raise ValueError(f"Unknown profiler {profiler!r}; use one of {', '.join(PROFILERS)}")
+        self.kind = kind
+        self.profiler = profiler
+        self.started = time.perf_counter()
+        self.spans = []
+        self.dropped = 0
+        self.stages = {}
+        self._lock = threading.Lock()
+        self._profiles = []
+        self._skipped = 0
+
+    @contextmanager
+    def span(self, name, **attrs):
+        span = Span(name, time.perf_counter() - self.started, attrs)
+        try:
+            yield span
+        finally:
+            span.duration = time.perf_counter() - self.started - span.offset
+            self._record(span)
+
+    def _record(self, span):
+        with self._lock:
+            if len(self.spans) < MAX_SPANS:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+            # Per-stage totals cover every span, including ones beyond MAX_SPANS
+            stage = self.stages.setdefault(span.name, {"count": 0, "total_ms": 0.0})
+            stage["count"] += 1
+            stage["total_ms"] += span.duration * 1000
+            for attr in COUNTED_ATTRS:
+                value = span.attrs.get(attr)
+                if isinstance(value, (int, float)):
+                    stage[attr] = stage.get(attr, 0) + value
+        stage_seconds.observe(span.duration, stage=span.name, kind=self.kind)
+        for attr in COUNTED_ATTRS:
+            value = span.attrs.get(attr)
+            if isinstance(value, (int, float)) and value:
+                stage_totals[attr].inc(value, stage=span.name, kind=self.kind)
+
+    def summary(self):
+        with self._lock:
+            return {name: dict(stage, total_ms=round(stage["total_ms"], 2)) for name, stage in self.stages.items()}
+
+    def profiled(self, fn):
+        # Wraps a blocking function so it runs under the requested profiler in whatever thread calls it
+        if self.profiler is None:
+            return fn
+
+        def run(*args, **kwargs):
+            if self.profiler == "cprofile":
+                import cProfile
+                if not _CPROFILE_LOCK.acquire(blocking=False):
+                    with self._lock:
+                        self._skipped += 1
+                    return fn(*args, **kwargs)
+                profile = cProfile.Profile()
+                try:
+                    return profile.runcall(fn, *args, **kwargs)
+                finally:
+                    _CPROFILE_LOCK.release()
+                    with self._lock:
+                        self._profiles.append(profile)
+            from pyinstrument import Profiler
+            profiler = Profiler(async_mode="disabled")
+            profiler.start()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profiler.stop()
+                with self._lock:
+                    self._profiles.append(profiler)
+        return run
+
+    def _write_profile(self, name):
+        with self._lock:
+            profiles = list(self._profiles)
+            skipped = self._skipped
+        if not profiles:
+            return {"profiler": self.profiler, "runs": 0, "skipped": skipped} if skipped else None
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        if self.profiler == "cprofile":
+            import pstats
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(os.path.join(PROFILE_DIR, f"{name}.prof"))
+            report = io.StringIO()
+            stats.stream = report
+            stats.sort_stats("cumulative").print_stats(40)
+            with open(os.path.join(PROFILE_DIR, f"{name}.txt"), "w", encoding="utf-8") as f:
+                f.write(report.getvalue())
+            return {"profiler": self.profiler, "runs": len(profiles), "skipped": skipped, "report_url": f"/static/profiles/{name}.txt", "pstats_url": f"/static/profiles/{name}.prof"}
+        with open(os.path.join(PROFILE_DIR, f"{name}.html"), "w", encoding="utf-8") as f:
+            f.write(profiles[-1].output_html())
+        with open(os.path.join(PROFILE_DIR, f"{name}.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(p.output_text(unicode=True) for p in profiles))
+        return {"profiler": self.profiler, "runs": len(profiles), "report_url": f"/static/profiles/{name}.txt", "html_url": f"/static/profiles/{name}.html"}
+
+    def finish(self, name=None):
+        """Returns the trace for the API response; writes the profiler report when one was requested."""
+        data = {
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 2),
+            "stages": self.summary(),
+            "spans": [span.to_dict() for span in list(self.spans)],
+        }
+        if self.dropped:
+            data["spans_dropped"] = self.dropped
+        if self.profiler:
+            try:
+                data["profile"] = self._write_profile(name or f"{self.kind}_{int(time.time())}")
+            except Exception as e:
+                print(f"[Metrics] Could not write {self.profiler} report: {e}")
+                data["profile"] = {"profiler": self.profiler, "error": str(e)}
+        return data
+
+
+class NullTrace:
+    # Stand-in when a function is called outside a job; spans still time nothing and cost nothing
+    kind = None
+    profiler = None
+
+    @contextmanager
+    def span(self, name, **attrs):
+        yield Span(name, 0.0, attrs)
+
+    def profiled(self, fn):
+        return fn
+
+
+NULL_TRACE = NullTrace()
+
+
+def check_profiler(profiler):
+    # Raises ValueError when the requested profiler cannot run here
+    if profiler is None:
+        return
+    if profiler not in PROFILERS:
+        raise ValueError(f"Unknown profiler {profiler!r}; use one of {', '.join(PROFILERS)}")
+    if profiler == "pyinstrument":
+        try:
+            import pyinstrument  # noqa: F401
+        except ImportError:
+            raise ValueError("The pyinstrument profiler is not installed on this server")
@@ -0,0 +1,180 @@
+# --- Imports ---
+from difflib import SequenceMatcher
+import os
+import re
+import pandas as pd
+
+# --- Standard Profile Columns ---
+STANDARD_COLS = ['name', 'designation', 'organization', 'email', 'phone']
+KEY_MAP = {
+    **dict.fromkeys(['name', 'doctor_name', 'faculty_name', 'professor_name', 'main_text'], 'name'),
+    **dict.fromkeys(['designation', 'title', 'position', 'role'], 'designation'),
+    **dict.fromkeys(['hospital', 'institute', 'department', 'division', 'unit', 'section', 'organization', 'org'], 'organization'),
+    **dict.fromkeys(['email', 'e-mail', 'mail'], 'email'),
+    **dict.fromkeys(['phone', 'mobile', 'contact'], 'phone'),
+}
+
+# Heuristics for filling name/designation/organization from unmapped columns (compiled once)
+NAME_RE = re.compile(r'(?:professor|lecturer|teacher|dr\.|md\.|mrs\.|mr\.|ashraf|sumit|aziz|kabir|islam|rana|banoo|chowdhury|sultana|sharmin|shahriar|mannan|hussain|saha|chakroborty|farhana|karmaker|sikder|moonmoon|rubina)', re.I)
+DESIGNATION_RE = re.compile(r'(?:professor|lecturer|assistant|chairperson|retired|emeritus|supernumerary|study leave|teacher)', re.I)
+ORGANIZATION_RE = re.compile(r'(?:department|institute|faculty|school|center|bureau|unit|section|division)', re.I)
+GENERIC_FILLS = [('name', NAME_RE), ('designation', DESIGNATION_RE), ('organization', ORGANIZATION_RE)]
+# Key shapes with fewer rows than this are mapped row by row; per-column pandas work only pays off on larger blocks
+SMALL_BLOCK = int(os.getenv("NORMALIZE_SMALL_BLOCK", "32"))
+
+# --- Fuzzy Dedup Settings ---
+FUZZY_THRESHOLD = float(os.getenv("DEDUP_FUZZY_THRESHOLD", "0.92"))
+FUZZY_MAX_BLOCK = int(os.getenv("DEDUP_FUZZY_MAX_BLOCK", "200"))
+TITLE_RE = re.compile(r'\b(?:dr|prof|professor|assoc|associate|asst|assistant|mr|mrs|ms|miss|md|mst|engr|sir)\b\.?', re.I)
+PUNCT_RE = re.compile(r'[^\w\s]')
+SPACE_RE = re.compile(r'\s+')
+
+
+def map_key(key):
+    return KEY_MAP.get(str(key).lower())
+
+
+def _truthy(series):
+    # Python truthiness per cell, as the row-wise version tested `not new_row[col]`
+    return series.notna() & series.map(bool)
+
+
+def normalize_profiles(data, fuzzy=False, seen=None):
+    """
+    Maps raw profile dicts onto STANDARD_COLS and drops duplicates, a column at a time.
+    Rows are batched by key signature (each extraction pass yields one shape), so key order
+    within a row, which decides precedence, is the same as in the old row-by-row loop.
+    Rows without a name are dropped; duplicates are keyed on (name, organization) after
+    strip/lowercase, and with `fuzzy` also on title-, punctuation- and spacing-insensitive names.
+    `seen` is a set of exact keys shared across calls, for normalizing a large input in batches.
+    """
+    if not data:
+        return pd.DataFrame(columns=STANDARD_COLS)
+    shapes = {}
+    for position, row in enumerate(data):
+        shapes.setdefault(tuple(row), []).append(position)
+    blocks = []
+    small = []
+    for keys, positions in shapes.items():
+        if len(positions) < SMALL_BLOCK:
+            small.extend(positions)
+            continue
+        raw = pd.DataFrame.from_records([data[i] for i in positions], columns=list(keys), index=positions)
+        blocks.append(_normalize_block(raw))
+    if small:
+        small.sort()
+        blocks.append(pd.DataFrame(_normalize_rows(data[i] for i in small), index=small, columns=STANDARD_COLS, dtype=object))
+    out = pd.concat(blocks).sort_index() if len(blocks) > 1 else blocks[0]
+    out = out[_truthy(out['name'])]
+    key_name = out['name'].astype(str).str.strip().str.lower()
+    key_org = out['organization'].astype(str).str.strip().str.lower()
+    unique = ~pd.DataFrame({'n': key_name, 'o': key_org}).duplicated(keep='first')
+    if seen is not None:
+        keys = list(zip(key_name[unique], key_org[unique]))
+        fresh = [key not in seen for key in keys]
+        seen.update(keys)
+        unique[unique] = fresh
+    out = out[unique]
+    if fuzzy:
+        out = fuzzy_dedup(out)
+    return out.reset_index(drop=True)
+
+
+def _normalize_block(raw):
+    # All rows of `raw` share one key order; `filled` tracks which output cells are already truthy
+    out = pd.DataFrame({col: pd.Series('', index=raw.index, dtype=object) for col in STANDARD_COLS})
+    filled = {col: pd.Series(False, index=raw.index) for col in STANDARD_COLS}
+    generic = []
+    for column in raw.columns:
+        target = map_key(column)
+        if target is None:
+            generic.append(column)
+            continue
+        empty = ~filled[target]
+        out.loc[empty, target] = raw.loc[empty, column]
+        filled[target] |= empty & _truthy(raw[column])
+    for column in generic:
+        text = raw[column].astype(str)
+        taken = pd.Series(False, index=raw.index)
+        # Same elif chain as before: a value goes to the first empty slot whose pattern it matches
+        for target, pattern in GENERIC_FILLS:
+            empty = ~filled[target] & ~taken
+            if not empty.any():
+                continue
+            match = text[empty].str.contains(pattern)
+            match = match[match].index
+            out.loc[match, target] = raw.loc[match, column]
+            filled[target][match] = True
+            taken[match] = True
+    return out
+
+
+def _filled(value):
+    # Same test as _truthy for a single cell (NaN != NaN)
+    return value is not None and value == value and bool(value)
+
+
+def _normalize_rows(rows):
+    # Row-wise twin of _normalize_block, for key shapes that only occur a few times
+    out = []
+    for row in rows:
+        new_row = dict.fromkeys(STANDARD_COLS, '')
+        generic = []
+        for key, value in row.items():
+            target = map_key(key)
+            if target is None:
+                generic.append(value)
+            elif not _filled(new_row[target]):
+                new_row[target] = value
+        for value in generic:
+            text = str(value)
+            for target, pattern in GENERIC_FILLS:
+                if not _filled(new_row[target]) and pattern.search(text):
+                    new_row[target] = value
+                    break
+        out.append(new_row)
+    return out
+
+
+def normalize_text(series, strip_titles=False):
+    # Lowercase, punctuation-free, single-spaced; honorifics removed for person names
+    text = series.astype(str)
+    if strip_titles:
+        text = text.str.replace(TITLE_RE, ' ', regex=True)
+    text = text.str.replace(PUNCT_RE, ' ', regex=True).str.replace(SPACE_RE, ' ', regex=True)
+    return text.str.strip().str.lower()
+
+
+def fuzzy_dedup(df, threshold=FUZZY_THRESHOLD, max_block=FUZZY_MAX_BLOCK):
+    """
+    Drops near-duplicate people. Names are compared without titles, punctuation or extra
+    whitespace; exact matches on (name, organization) go first via drop_duplicates. Remaining
+    rows are blocked on organization plus the first letters of the longest name token, and only
+    pairs inside a block are scored with SequenceMatcher, so the work stays near-linear.
+    """
+    if df.empty:
+        return df
+    name = normalize_text(df['name'], strip_titles=True)
+    org = normalize_text(df['organization'])
+    keys = pd.DataFrame({'n': name, 'o': org}, index=df.index)
+    df = df[~keys.duplicated(keep='first')]
+    keys = keys.loc[df.index]
+    longest = keys['n'].str.split().map(lambda tokens: max(tokens, key=len)[:3] if tokens else '')
+    drop = set()
+    for _, block in keys.groupby([keys['o'], longest], sort=False):
+        if len(block) < 2 or len(block) > max_block:
+            continue
+        names = list(zip(block.index, block['n']))
+        matcher = SequenceMatcher(autojunk=False)
+        for i, (idx_a, a) in enumerate(names):
+            if idx_a in drop:
+                continue
+            # seq2 is the side SequenceMatcher preprocesses, so it stays fixed for the inner loop
+            matcher.set_seq2(a)
+            for idx_b, b in names[i + 1:]:
+                if idx_b in drop:
+                    continue
+                matcher.set_seq1(b)
+                if matcher.real_quick_ratio() >= threshold and matcher.quick_ratio() >= threshold and matcher.ratio() >= threshold:
+                    drop.add(idx_b)
+    return df.drop(index=list(drop))
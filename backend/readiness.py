@@ -0,0 +1,151 @@
+# --- Imports ---
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+import os
+import time
+
+# --- Readiness Settings (override through environment or per request) ---
+READY_TIMEOUT = float(os.getenv("PAGE_READY_TIMEOUT", "15"))
+SCROLL_TIMEOUT = float(os.getenv("PAGE_SCROLL_TIMEOUT", "30"))
+QUIET_MS = int(os.getenv("PAGE_QUIET_MS", "500"))
+MAX_SCROLL_ROUNDS = int(os.getenv("PAGE_MAX_SCROLL_ROUNDS", "50"))
+# A wait gives up on DOM quiet after this many `quiet_ms` windows of network idle
+# (tickers, carousels and clocks rewrite the DOM forever), and a scroll round waits no longer
+QUIET_ROUNDS = int(os.getenv("PAGE_QUIET_ROUNDS", "4"))
+POLL_INTERVAL = 0.1
+
+
+class RenderCancelled(Exception):
+    # Raised inside a render when its job was cancelled, so the driver goes back to the pool early
+    pass
+
+# Counts in-flight fetch/XHR calls and records the time of the last DOM mutation.
+# Only added/removed nodes and text count: attribute churn (style, class, aria-* from
+# animations and sliders) never stops on many pages and says nothing about content.
+# Installed once per document; a navigation wipes it and the next wait re-installs it.
+_INSTALL_PROBE_JS = """
+if (!window.__udxProbe) {
+  var probe = window.__udxProbe = {inflight: 0, lastMutation: Date.now()};
+  new MutationObserver(function () { probe.lastMutation = Date.now(); })
+    .observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+  if (window.fetch) {
+    var origFetch = window.fetch;
+    window.fetch = function () {
+      probe.inflight++;
+      return origFetch.apply(this, arguments).finally(function () { probe.inflight--; });
+    };
+  }
+  var origSend = XMLHttpRequest.prototype.send;
+  XMLHttpRequest.prototype.send = function () {
+    probe.inflight++;
+    this.addEventListener('loadend', function () { probe.inflight--; });
+    return origSend.apply(this, arguments);
+  };
+}
+var p = window.__udxProbe;
+return {
+  ready: document.readyState,
+  inflight: p.inflight,
+  quietMs: Date.now() - p.lastMutation,
+  resources: performance.getEntriesByType('resource').length,
+  height: document.body ? document.body.scrollHeight : 0
+};
+"""
+
+
+def page_state(driver):
+    return driver.execute_script(_INSTALL_PROBE_JS)
+
+
+def check_cancel(cancel):
+    # `cancel` is the job's threading.Event (or None outside jobs)
+    if cancel is not None and cancel.is_set():
+        raise RenderCancelled()
+
+
+def wait_for_ready(driver, timeout=READY_TIMEOUT, selector=None, quiet_ms=QUIET_MS, cancel=None):
+    """
+    Waits until the page is usable instead of sleeping a fixed time:
+    the selector (if given) is present, the document has loaded, no fetch/XHR
+    is in flight and neither the DOM nor the resource list changed for `quiet_ms`.
+    A DOM that keeps changing while the network stays idle for QUIET_ROUNDS * `quiet_ms`
+    counts as settled. Returns True when the page settled, False when the timeout was hit.
+    Raises RenderCancelled as soon as `cancel` is set.
+    """
+    deadline = time.monotonic() + timeout
+    if selector:
+        present = EC.presence_of_element_located((By.CSS_SELECTOR, selector))
+
+        def found(driver):
+            check_cancel(cancel)
+            return present(driver)
+
+        try:
+            WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL).until(found)
+        except TimeoutException:
+            print(f"[Readiness] Selector {selector!r} not found within {timeout}s")
+    last_resources = None
+    # Time of the last network activity: a fetch/XHR in flight or a new resource entry
+    network_since = time.monotonic()
+    while True:
+        check_cancel(cancel)
+        try:
+            state = page_state(driver)
+        except WebDriverException:
+            # Page is mid-navigation; try again on the next tick
+            state = None
+        now = time.monotonic()
+        if state:
+            if state["resources"] != last_resources:
+                last_resources = state["resources"]
+                network_since = now
+            if state["inflight"] > 0:
+                network_since = now
+            idle_ms = (now - network_since) * 1000
+            if state["ready"] == "complete" and idle_ms >= quiet_ms:
+                if state["quietMs"] >= quiet_ms or idle_ms >= quiet_ms * QUIET_ROUNDS:
+                    return True
+        if now >= deadline:
+            return False
+        time.sleep(POLL_INTERVAL)
+
+
+def scroll_to_end(driver, timeout=SCROLL_TIMEOUT, quiet_ms=QUIET_MS, max_rounds=MAX_SCROLL_ROUNDS, cancel=None):
+    """
+    Scrolls until `scrollHeight` stops growing (infinite scroll / lazy loading),
+    the timeout expires or `max_rounds` is reached. Each round waits at most
+    QUIET_ROUNDS * `quiet_ms` for the page to grow. Returns the number of rounds that grew the page.
+    """
+    deadline = time.monotonic() + timeout
+    height = page_state(driver)["height"]
+    grown = 0
+    for _ in range(max_rounds):
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight)")
+        scrolled_at = time.monotonic()
+        round_deadline = min(deadline, scrolled_at + quiet_ms * QUIET_ROUNDS / 1000)
+        # Wait for either new content (height grows) or `quiet_ms` without network or DOM activity
+        # counted from the scroll itself: the page was already quiet before it, and the scroll
+        # handler's fetch may not have started by the first poll
+        new_height = height
+        while time.monotonic() < round_deadline:
+            check_cancel(cancel)
+            state = page_state(driver)
+            new_height = state["height"]
+            if new_height > height:
+                break
+            quiet = min(state["quietMs"], (time.monotonic() - scrolled_at) * 1000)
+            if state["inflight"] <= 0 and quiet >= quiet_ms:
+                break
+            time.sleep(POLL_INTERVAL)
+        if new_height <= height or time.monotonic() >= deadline:
+            break
+        height = new_height
+        grown += 1
+    return grown
+
+
+def settle(driver, timeout=READY_TIMEOUT, quiet_ms=QUIET_MS, cancel=None):
+    # Short wait after an interaction (click, popup close); never longer than needed
+    return wait_for_ready(driver, timeout=min(timeout, 5), quiet_ms=quiet_ms, cancel=cancel)
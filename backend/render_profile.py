@@ -0,0 +1,125 @@
+# --- Imports ---
+import os
+
+# --- Render Profile Settings (override through environment or the request's "render" option) ---
+DEFAULT_PROFILE = os.getenv("RENDER_PROFILE", "lite")
+VIEWPORT = tuple(int(v) for v in os.getenv("RENDER_VIEWPORT", "1280x900").lower().split("x"))
+# Limits only the scripts the scraper itself runs through the driver. The page's own JS timers are
+# not capped: virtual time (Emulation.setVirtualTimePolicy) would also stall the Date.now clock
+# the readiness probe measures quiet periods with, so long-running page timers are out of scope.
+SCRIPT_TIMEOUT = float(os.getenv("RENDER_SCRIPT_TIMEOUT", "10"))
+
+# URL patterns for Network.setBlockedURLs, by resource kind. Only the bytes are blocked:
+# <img src>, <link href> and friends stay in the DOM for the parsers.
+RESOURCE_PATTERNS = {
+    "image": ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.bmp", "*.ico", "*.svg", "*.tif", "*.tiff"],
+    "font": ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot", "*fonts.googleapis.com*", "*fonts.gstatic.com*", "*use.typekit.net*"],
+    "media": ["*.mp4", "*.webm", "*.ogg", "*.mp3", "*.wav", "*.m4a", "*.mov", "*.avi", "*.m3u8", "*.mpd"],
+    "stylesheet": ["*.css"],
+    "tracker": [
+        "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*googlesyndication.com*",
+        "*googleadservices.com*", "*adservice.google.*", "*connect.facebook.net*", "*facebook.com/tr*",
+        "*hotjar.com*", "*clarity.ms*", "*mc.yandex.ru*", "*scorecardresearch.com*", "*quantserve.com*",
+        "*taboola.com*", "*outbrain.com*", "*criteo.com*", "*criteo.net*", "*amazon-adsystem.com*",
+        "*adnxs.com*", "*analytics.tiktok.com*", "*static.ads-twitter.com*", "*snap.licdn.com*",
+    ],
+    "embed": [
+        "*youtube.com/embed*", "*youtube-nocookie.com*", "*player.vimeo.com*", "*google.com/maps*",
+        "*maps.googleapis.com*", "*platform.twitter.com*", "*tawk.to*", "*livechatinc.com*",
+    ],
+}
+RESOURCE_KINDS = tuple(RESOURCE_PATTERNS)
+
+PRESETS = {
+    "full": (),
+    "lite": ("image", "font", "media", "tracker", "embed"),
+    "minimal": ("image", "font", "media", "stylesheet", "tracker", "embed"),
+}
+
+
+class RenderProfile:
+    """
+    What a headless render is allowed to download, plus viewport and script limits.
+    Applied to a pooled driver over CDP before each navigation; every field is set on
+    every apply, so a driver never carries the previous request's profile.
+    """
+
+    def __init__(self, name=DEFAULT_PROFILE, block=None, block_domains=(), viewport=VIEWPORT, script_timeout=SCRIPT_TIMEOUT):
+        if name not in PRESETS:
+            raise ValueError(f"Unknown render profile {name!r}; use one of {', '.join(PRESETS)}")
+        if isinstance(block, str):
+            block = [block]
+        block = PRESETS[name] if block is None else tuple(block)
+        unknown = [kind for kind in block if kind not in RESOURCE_PATTERNS]
+        if unknown:
+            raise ValueError(f"Unknown resource kind(s) {', '.join(unknown)}; use {', '.join(RESOURCE_KINDS)}")
+        self.name = name
+        self.block = tuple(sorted(set(block)))
+        self.block_domains = tuple(sorted({d.strip().lower() for d in block_domains if d and d.strip()}))
+        self.viewport = (int(viewport[0]), int(viewport[1]))
+        self.script_timeout = float(script_timeout)
+
+    @classmethod
+    def from_request(cls, options):
+        """
+        Accepts a preset name ("full", "lite", "minimal") or an object with
+        profile, block, block_domains, viewport ([width, height] or "WxH") and script_timeout.
+        Raises ValueError for anything it cannot apply.
+        """
+        if options is None:
+            return cls()
+        if isinstance(options, str):
+            return cls(options)
+        if not isinstance(options, dict):
+            raise ValueError("render must be a profile name or an object")
+        viewport = options.get("viewport", VIEWPORT)
+        if isinstance(viewport, str):
+            viewport = viewport.lower().split("x")
+        if len(viewport) != 2:
+            raise ValueError("viewport must be [width, height] or 'WIDTHxHEIGHT'")
+        return cls(
+            options.get("profile", DEFAULT_PROFILE),
+            block=options.get("block"),
+            block_domains=options.get("block_domains") or (),
+            viewport=viewport,
+            script_timeout=options.get("script_timeout", SCRIPT_TIMEOUT),
+        )
+
+    def blocked_patterns(self):
+        patterns = [p for kind in self.block for p in RESOURCE_PATTERNS[kind]]
+        patterns.extend(f"*://{domain}/*" for domain in self.block_domains)
+        patterns.extend(f"*.{domain}/*" for domain in self.block_domains)
+        return patterns
+
+    def apply(self, driver):
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.blocked_patterns()})
+        width, height = self.viewport
+        driver.execute_cdp_cmd("Emulation.setDeviceMetricsOverride", {
+            "width": width, "height": height, "deviceScaleFactor": 1, "mobile": False,
+        })
+        driver.set_script_timeout(self.script_timeout)
+
+    def to_dict(self):
+        # Also the cache key part: pages rendered under different profiles are cached apart
+        return {
+            "profile": self.name, "block": list(self.block), "block_domains": list(self.block_domains),
+            "viewport": list(self.viewport), "script_timeout": self.script_timeout,
+        }
+
+
+# Transfer totals as seen by the page; blocked requests never show up here
+_RESOURCE_STATS_JS = """
+var entries = performance.getEntriesByType('resource');
+var nav = performance.getEntriesByType('navigation')[0];
+var bytes = nav ? (nav.transferSize || 0) : 0;
+for (var i = 0; i < entries.length; i++) { bytes += entries[i].transferSize || 0; }
+return {requests: entries.length + (nav ? 1 : 0), bytes: bytes};
+"""
+
+
+def resource_stats(driver):
+    try:
+        return driver.execute_script(_RESOURCE_STATS_JS) or {}
+    except Exception:
+        return {}
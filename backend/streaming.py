@@ -0,0 +1,175 @@
+# --- Imports ---
+from lxml import etree
+from io import BytesIO
+import re
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+EMAIL_RE = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b")
+_CELL_TAGS = ('td', 'th')
+
+
+def iter_data(html, data_types=("emails", "images", "tables")):
+    """
+    Streams through the document once with lxml.etree.iterparse and yields events
+    as soon as they are known:
+      ("email", address)            - each distinct address, from text, comments and attribute values
+      ("image", src)                - every <img src>
+      ("table", table_no)           - a table opened (numbered in document order)
+      ("table_row", table_no, row_no, cells)
+                                    - a finished row, once for every open table
+    Nested tables come out as in the BeautifulSoup mode: an outer table also lists the rows of
+    the tables inside it, and a row lists every cell below it, inner ones included. Rows and cells
+    are numbered by where they start, so an outer row can arrive after the inner rows it contains.
+    Finished subtrees are freed as the parser moves on, so memory stays flat on large pages.
+    """
+    want_emails = "emails" in data_types
+    want_images = "images" in data_types
+    want_tables = "tables" in data_types
+    data = html.encode("utf-8") if isinstance(html, str) else html
+    if not data.strip():
+        return
+    seen_emails = set()
+    # [table_no, rows started so far] per open table; [cells, (table_no, row_no) slots] per open row;
+    # [(cells, index) slots] per open cell
+    open_tables = []
+    open_rows = []
+    open_cells = []
+    table_count = 0
+
+    def emails_in(text):
+        if not text or '@' not in text:
+            return
+        for email in EMAIL_RE.findall(text):
+            if email not in seen_emails:
+                seen_emails.add(email)
+                yield ("email", email)
+
+    def leftovers(node):
+        # Text carried by a child that is about to be dropped: its tail, and its body if it is a comment
+        yield from emails_in(node.tail)
+        if not isinstance(node.tag, str):
+            yield from emails_in(node.text)
+
+    parser = etree.iterparse(BytesIO(data), events=("start", "end"), html=True, encoding="utf-8", huge_tree=True)
+    for event, elem in parser:
+        tag = elem.tag
+        if event == "start":
+            if tag == 'table':
+                open_tables.append([table_count, 0])
+                if want_tables:
+                    yield ("table", table_count)
+                table_count += 1
+            elif tag == 'tr':
+                open_rows.append([[], [(table[0], table[1]) for table in open_tables]])
+                for table in open_tables:
+                    table[1] += 1
+            elif tag in _CELL_TAGS:
+                slots = []
+                for cells, _ in open_rows:
+                    slots.append((cells, len(cells)))
+                    cells.append('')
+                open_cells.append(slots)
+            continue
+        if want_emails:
+            yield from emails_in(elem.text)
+            for value in elem.attrib.values():
+                yield from emails_in(value)
+            for child in elem:
+                yield from leftovers(child)
+        if tag == 'img' and want_images:
+            src = elem.get("src")
+            if src:
+                yield ("image", src)
+        elif tag in _CELL_TAGS:
+            if open_cells:
+                text = ''.join(s.strip() for s in elem.itertext())
+                for cells, i in open_cells.pop():
+                    cells[i] = text
+        elif tag == 'tr':
+            if open_rows:
+                cells, slots = open_rows.pop()
+                if want_tables:
+                    for table_no, row_no in slots:
+                        yield ("table_row", table_no, row_no, list(cells))
+        elif tag == 'table':
+            if open_tables:
+                open_tables.pop()
+        # Free what is no longer needed; cell text is collected only when the cell closes
+        if not open_cells:
+            elem.clear(keep_tail=True)
+            previous = elem.getprevious()
+            while previous is not None:
+                if want_emails:
+                    yield from leftovers(previous)
+                elem.getparent().remove(previous)
+                previous = elem.getprevious()
+
+
+def collect_data(html, data_types=("emails", "images", "tables")):
+    # Same result shape as the BeautifulSoup parse_data
+    result = {}
+    if "emails" in data_types:
+        result["emails"] = []
+    if "images" in data_types:
+        result["images"] = []
+    if "tables" in data_types:
+        result["tables"] = []
+    for event in iter_data(html, data_types):
+        kind = event[0]
+        if kind == "email":
+            result["emails"].append(event[1])
+        elif kind == "image":
+            result["images"].append(event[1])
+        elif kind == "table":
+            result["tables"].append([])
+        elif kind == "table_row":
+            rows = result["tables"][event[1]]
+            while len(rows) <= event[2]:
+                rows.append(None)
+            rows[event[2]] = event[3]
+    if "tables" in result:
+        # Rows the parser never closed leave no entry
+        result["tables"] = [[row for row in rows if row is not None] for rows in result["tables"]]
+    return result
+
+
+def process_rss_kb():
+    """
+    (current, peak) resident memory of the whole process in KiB, from /proc where available,
+    else only the peak from getrusage; None for what the platform cannot tell.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            fields = dict(line.split(":", 1) for line in f if line.startswith(("VmRSS:", "VmHWM:")))
+        return int(fields["VmRSS"].split()[0]), int(fields["VmHWM"].split()[0])
+    except (OSError, KeyError, ValueError):
+        pass
+    if resource is None:
+        return None, None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return None, peak // 1024 if sys.platform == "darwin" else peak
+
+
+def measure(fn, *args, **kwargs):
+    """
+    Runs a parse function and returns (result, stats) with its wall time and process memory.
+    Parses of other jobs run in parallel worker threads, so memory cannot be attributed to one
+    call: `process_rss_growth_kb` is the change in resident memory across the call and
+    `process_peak_rss_kb` the process high-water mark, both process-wide.
+    """
+    before, _ = process_rss_kb()
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    after, peak = process_rss_kb()
+    stats = {"parse_ms": round(elapsed * 1000, 1), "process_peak_rss_kb": peak}
+    if before is not None and after is not None:
+        stats["process_rss_growth_kb"] = after - before
+    return result, stats
@@ -1,6 +1,21 @@
 import React, { useState } from 'react';
 import axios from 'axios';
 
+const API = 'http://localhost:8000';
+
+// Extraction endpoints return a job id right away; poll the job until it finishes
+async function waitForJob(jobId) {
+  while (true) {
+    const res = await axios.get(`${API}/jobs/${jobId}`);
+    const job = res.data;
+    if (job.status === 'done') return job.result;
+    if (job.status === 'failed' || job.status === 'cancelled' || job.error) {
+      throw new Error(job.error || `Job ${job.status}`);
+    }
+    await new Promise(resolve => setTimeout(resolve, 1000));
+  }
+}
+
 export default function Home() {
   const [url, setUrl] = useState('');
   const [query, setQuery] = useState('Get all emails and images');
@@ -13,11 +28,12 @@ export default function Home() {
     setLoadingProfile(true);
     setExcelLink('');
     try {
-      const res = await axios.post('http://localhost:8000/profile_excel', {
+      const res = await axios.post(`${API}/profile_excel`, {
         url: profileUrl
       });
-      if (res.data && res.data.excel_url) {
-        setExcelLink(res.data.excel_url);
+      const data = res.data && res.data.job_id ? await waitForJob(res.data.job_id) : res.data;
+      if (data && data.excel_url) {
+        setExcelLink(data.excel_url);
       } else {
         setExcelLink('Excel creation failed.');
       }
@@ -36,11 +52,12 @@ export default function Home() {
     if (query.toLowerCase().includes('table')) data_types.push('tables');
     if (data_types.length === 0) data_types = ['emails', 'images', 'tables'];
     try {
-      const res = await axios.post('http://localhost:8000/extract', {
+      const res = await axios.post(`${API}/extract`, {
         url,
         data_types
       });
-      setResult(res.data.result);
+      const data = res.data && res.data.job_id ? await waitForJob(res.data.job_id) : res.data;
+      setResult(data.result);
     } catch (err) {
       setResult({ error: 'Extraction failed.' });
     }